@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    '''Счетчики использования соединений с базой в текущем процессе'''
+
+    fields = ('requests', 'created', 'health_checks', 'health_check_failures')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(self.fields, 0)
+
+    def increment(self, name):
+        with self._lock:
+            self._values[name] += 1
+            return self._values[name]
+
+    def snapshot(self):
+        with self._lock:
+            values = dict(self._values)
+        values['reused'] = max(values['requests'] - values['created'], 0)
+        return values
+
+
+connection_stats = ConnectionStats()
+
+
+def check_connections():
+    '''Закрывает постоянные соединения, которые перестали отвечать.
+
+    В Django 3.2 нет CONN_HEALTH_CHECKS, поэтому соединение, разорванное
+    сервером или pgbouncer, иначе обнаруживается только ошибкой первого
+    запроса. Проверка выполняется не чаще DB_HEALTH_CHECK_INTERVAL секунд.
+    '''
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked_at = getattr(connection, 'health_checked_at', 0)
+        if now - checked_at < settings.DB_HEALTH_CHECK_INTERVAL:
+            continue
+        connection.health_checked_at = now
+        connection_stats.increment('health_checks')
+        if not connection.is_usable():
+            connection_stats.increment('health_check_failures')
+            connection.close()
+
+
+def connection_created(connection):
+    connection.health_checked_at = time.monotonic()
+    connection_stats.increment('created')
+
+
+def request_started():
+    requests = connection_stats.increment('requests')
+    check_connections()
+    interval = settings.DB_STATS_LOG_INTERVAL
+    if interval and requests % interval == 0:
+        logger.info(
+            'Соединения с базой: %s',
+            ', '.join(
+                f'{name}={value}'
+                for name, value in connection_stats.snapshot().items()
+            )
+        )
@@ -0,0 +1,276 @@
+import random
+import time
+
+from api.v1.cache import invalidate_cache
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
+from recipes.search import update_search_vectors
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+BUDGETS = {
+    'recipes': {
+        'url': '/api/recipes/?limit=50',
+        'queries': 6,
+        'p95_ms': 500,
+        'bytes': 150000,
+    },
+    'recipes_cursor': {
+        'url': '/api/recipes/?page_size=50',
+        'queries': 5,
+        'p95_ms': 500,
+        'bytes': 150000,
+    },
+    'subscriptions': {
+        'url': '/api/users/subscriptions/?limit=20&recipes_limit=3',
+        'queries': 6,
+        'p95_ms': 300,
+        'bytes': 50000,
+    },
+    'recipes_search': {
+        'url': '/api/recipes/?search=рецепт&limit=50',
+        'queries': 6,
+        'p95_ms': 500,
+        'bytes': 150000,
+    },
+    'tags': {
+        'url': '/api/tags/',
+        'queries': 1,
+        'p95_ms': 50,
+        'bytes': 5000,
+        'cache': 'tags',
+    },
+    'ingredients': {
+        'url': '/api/ingredients/?name={prefix}',
+        'queries': 1,
+        'p95_ms': 100,
+        'bytes': 50000,
+        'cache': 'ingredients',
+    },
+    'download_shopping_cart': {
+        'url': '/api/recipes/download_shopping_cart/',
+        'queries': 2,
+        'p95_ms': 300,
+        'bytes': 50000,
+    },
+}
+METRICS = ('queries', 'p95_ms', 'bytes')
+
+
+def bulk_create(model, objects):
+    '''Создает объекты пачкой и возвращает их уже с первичными ключами'''
+    last_id = model.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+    model.objects.bulk_create(objects, batch_size=1000)
+    return list(model.objects.filter(id__gt=last_id).order_by('id'))
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def measure_url(client, url, repeat, cache_namespace=None):
+    '''Число запросов, перцентили времени ответа и размер ответа.
+
+    Для кэшируемых эндпоинтов перед каждым запросом сбрасывается версия
+    кэша cache_namespace, чтобы замерялся ответ представления, а не кэша.
+    '''
+    timings = []
+    queries = 0
+    size = 0
+    for _ in range(repeat):
+        if cache_namespace:
+            invalidate_cache(cache_namespace)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f'{url} вернул {response.status_code}')
+        queries = max(queries, len(context))
+        size = max(size, len(content))
+    return {
+        'queries': queries,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'bytes': size,
+    }
+
+
+def get_violations(name, result, metrics=METRICS):
+    return [
+        f'{name}.{metric} = {result[metric]:.0f} '
+        f'(бюджет {BUDGETS[name][metric]})'
+        for metric in metrics
+        if result[metric] > BUDGETS[name][metric]
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими данными и измеряет число запросов, '
+        'время ответа и размер ответа основных эндпоинтов API. '
+        'Все изменения в базе откатываются после замера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=5000)
+        parser.add_argument('--cart', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user, prefix = self.seed(options)
+            results = self.measure(user, prefix, options['repeat'])
+            transaction.set_rollback(True)
+        violations = self.report(results)
+        if violations:
+            raise CommandError(
+                'Превышены бюджеты: {}'.format('; '.join(violations))
+            )
+        self.stdout.write(self.style.SUCCESS('Все бюджеты соблюдены'))
+
+    def seed(self, options):
+        started = time.perf_counter()
+        password = make_password('benchmark')
+        users = bulk_create(User, [
+            User(
+                username=f'bench_user_{index}',
+                email=f'bench_user_{index}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for index in range(options['users'])
+        ])
+        ingredients = list(Ingredient.objects.all()[:2000])
+        if not ingredients:
+            ingredients = bulk_create(Ingredient, [
+                Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+                for index in range(200)
+            ])
+        tags = list(Tag.objects.all())
+        if not tags:
+            tags = bulk_create(Tag, [
+                Tag(name=f'тег {index}', slug=f'bench-tag-{index}')
+                for index in range(3)
+            ])
+        recipes = bulk_create(Recipe, [
+            Recipe(
+                author=random.choice(users),
+                name=f'Рецепт {index}',
+                image='recipes/benchmark.png',
+                text='Описание рецепта ' * 10,
+                cooking_time=random.randint(1, 120),
+            )
+            for index in range(options['recipes'])
+        ])
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe,
+                ingredient=ingredient,
+                amount=random.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in random.sample(
+                ingredients,
+                min(options['ingredients_per_recipe'], len(ingredients))
+            )
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=random.choice(tags))
+            for recipe in recipes
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=users[user_index], recipe=recipes[recipe_index])
+            for user_index, recipe_index in self.random_pairs(
+                options['favorites'], len(users), len(recipes)
+            )
+        )
+        Follow.objects.bulk_create(
+            Follow(user=users[user_index], author=users[author_index])
+            for user_index, author_index in self.random_pairs(
+                options['follows'], len(users), len(users)
+            )
+            if user_index != author_index
+        )
+        user = users[0]
+        followed = set(
+            Follow.objects.filter(user=user).values_list('author', flat=True)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for author in users[1:21]
+            if author.id not in followed
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe)
+            for recipe in random.sample(
+                recipes, min(options['cart'], len(recipes))
+            )
+        )
+        ShoppingCartIngredient.rebuild(users=[user])
+        Recipe.objects.filter(id__gte=recipes[0].id).recalculate_counters()
+        update_search_vectors(Recipe.objects.filter(id__gte=recipes[0].id))
+        self.stdout.write(
+            'Данные созданы за {:.1f} с'.format(time.perf_counter() - started)
+        )
+        return user, random.choice(ingredients).name[:2]
+
+    @staticmethod
+    def random_pairs(count, first_size, second_size):
+        count = min(count, first_size * second_size)
+        pairs = set()
+        while len(pairs) < count:
+            pairs.add((
+                random.randrange(first_size),
+                random.randrange(second_size)
+            ))
+        return pairs
+
+    def measure(self, user, prefix, repeat):
+        client = APIClient()
+        client.force_authenticate(user)
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            return {
+                name: measure_url(
+                    client,
+                    budget['url'].format(prefix=prefix),
+                    repeat,
+                    budget.get('cache'),
+                )
+                for name, budget in BUDGETS.items()
+            }
+
+    def report(self, results):
+        violations = []
+        for name, result in results.items():
+            self.stdout.write(
+                '{:<24} запросов: {:>4}  p50: {:>8.1f} мс  '
+                'p95: {:>8.1f} мс  байт: {:>8}'.format(
+                    name,
+                    result['queries'],
+                    result['p50_ms'],
+                    result['p95_ms'],
+                    result['bytes'],
+                )
+            )
+            violations += get_violations(name, result)
+        return violations
@@ -0,0 +1,103 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils.module_loading import import_string
+from rest_framework.test import APIClient
+
+from .benchmark_api import percentile
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет стоимость хэширования паролей для доступных алгоритмов '
+        'и пропускную способность регистрации и входа на одно ядро. '
+        'Созданные пользователи удаляются после замера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--hasher',
+            action='append',
+            dest='hashers',
+            choices=list(settings.PASSWORD_HASHER_CLASSES),
+            help='Алгоритм для замера, можно указать несколько раз',
+        )
+        parser.add_argument(
+            '--skip-endpoints',
+            action='store_true',
+            help='Не измерять регистрацию и вход через API',
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for name in options['hashers'] or settings.PASSWORD_HASHER_CLASSES:
+            self.measure_hasher(name, repeat)
+        if not options['skip_endpoints']:
+            with transaction.atomic():
+                self.measure_endpoints(repeat)
+                transaction.set_rollback(True)
+
+    def measure_hasher(self, name, repeat):
+        hasher = import_string(settings.PASSWORD_HASHER_CLASSES[name])()
+        try:
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+        except ValueError as error:
+            self.stdout.write(f'{name:<8} недоступен: {error}')
+            return
+        encode_timings = []
+        verify_timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            hasher.encode(PASSWORD, hasher.salt())
+            encode_timings.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            hasher.verify(PASSWORD, encoded)
+            verify_timings.append(time.perf_counter() - started)
+        self.report(f'{name} hash', encode_timings)
+        self.report(f'{name} verify', verify_timings)
+
+    def measure_endpoints(self, repeat):
+        client = APIClient()
+        signup_timings = []
+        login_timings = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for index in range(repeat):
+                email = f'bench_auth_{index}@example.com'
+                started = time.perf_counter()
+                response = client.post('/api/users/', {
+                    'email': email,
+                    'username': f'bench_auth_{index}',
+                    'first_name': 'Имя',
+                    'last_name': 'Фамилия',
+                    'password': PASSWORD,
+                }, format='json')
+                signup_timings.append(time.perf_counter() - started)
+                if response.status_code != 201:
+                    self.stderr.write(f'Регистрация: {response.data}')
+                    return
+                started = time.perf_counter()
+                response = client.post('/api/auth/token/login/', {
+                    'email': email,
+                    'password': PASSWORD,
+                }, format='json')
+                login_timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    self.stderr.write(f'Вход: {response.data}')
+                    return
+        self.report('signup', signup_timings)
+        self.report('login', login_timings)
+
+    def report(self, name, timings):
+        p50 = percentile(timings, 50) * 1000
+        self.stdout.write(
+            '{:<16} p50: {:>8.1f} мс  p95: {:>8.1f} мс  '
+            '~{:>7.1f} оп/с на ядро'.format(
+                name, p50, percentile(timings, 95) * 1000, 1000 / p50
+            )
+        )
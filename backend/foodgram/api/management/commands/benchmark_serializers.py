@@ -0,0 +1,106 @@
+import random
+import time
+
+from api.v1.read_serializers import (IngredientValuesSerializer,
+                                     RecipeValuesSerializer)
+from api.v1.renderers import FastJSONRenderer, orjson
+from api.v1.serializers import GetRecipeSerializer, IngredientSerializer
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from recipes.models import Ingredient, Recipe
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .benchmark_api import Command as BenchmarkCommand
+from .benchmark_api import percentile
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Сравнивает время сериализации и рендеринга списков рецептов и '
+        'ингредиентов сериализаторами DRF и сериализаторами по строкам '
+        'values() в пересчете на 1000 объектов. Все изменения в базе '
+        'откатываются после замера.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(
+            users=300, recipes=1000, favorites=2000, follows=1000, repeat=5
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            user, _ = self.seed(options)
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                results = self.measure_serializers(user, options)
+            transaction.set_rollback(True)
+        for name, count, timings in results:
+            self.stdout.write(
+                '{:<40} объектов: {:>6}  p50: {:>8.1f} мс/1000  '
+                'p95: {:>8.1f} мс/1000'.format(
+                    name,
+                    count,
+                    percentile(timings, 50) * 1000 * 1000 / max(count, 1),
+                    percentile(timings, 95) * 1000 * 1000 / max(count, 1),
+                )
+            )
+        if orjson is None:
+            self.stdout.write(
+                'orjson не установлен: FastJSONRenderer использует json'
+            )
+
+    def measure_serializers(self, user, options):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        context = {'request': request}
+        recipes = Recipe.objects.with_user_data(user).order_by(
+            '-pub_date', '-id'
+        )
+        recipe_values = RecipeValuesSerializer(context=context)
+        ingredient_values = IngredientValuesSerializer(context=context)
+        cases = {
+            'recipes: GetRecipeSerializer': lambda: GetRecipeSerializer(
+                list(recipes[:options['recipes']]), many=True, context=context
+            ).data,
+            'recipes: RecipeValuesSerializer': lambda: recipe_values.serialize(
+                recipe_values.get_values(recipes)[:options['recipes']]
+            ),
+            'ingredients: IngredientSerializer': lambda: IngredientSerializer(
+                Ingredient.objects.all(), many=True, context=context
+            ).data,
+            'ingredients: IngredientValuesSerializer': (
+                lambda: ingredient_values.serialize(
+                    ingredient_values.get_values(Ingredient.objects.all())
+                )
+            ),
+        }
+        results = []
+        rendered = {}
+        for name, serialize in cases.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                data = serialize()
+                timings.append(time.perf_counter() - started)
+            results.append((name, len(data), timings))
+            rendered[name] = JSONRenderer().render(data)
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    renderer.render(data)
+                    timings.append(time.perf_counter() - started)
+                results.append((
+                    f'  + {type(renderer).__name__}', len(data), timings
+                ))
+        names = list(rendered)
+        for drf_name, values_name in zip(names[::2], names[1::2]):
+            if rendered[drf_name] != rendered[values_name]:
+                raise CommandError(
+                    f'Ответы {drf_name} и {values_name} различаются'
+                )
+        return results
@@ -0,0 +1,164 @@
+import http.client
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_api import percentile
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест API: измеряет пропускную способность и '
+        'задержки по перцентилям. С --compare по очереди запускает '
+        'gunicorn в режимах WSGI и ASGI и сравнивает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Адрес уже запущенного сервера',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Запустить сервер в обоих режимах на --port',
+        )
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь для запросов, можно указать несколько раз',
+        )
+        parser.add_argument(
+            '--host',
+            default=(settings.ALLOWED_HOSTS or ['localhost'])[0],
+            help='Значение заголовка Host, допустимое в ALLOWED_HOSTS',
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен для запросов к рецептам',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/tags/', '/api/ingredients/']
+        if options['token'] and not options['paths']:
+            paths.append('/api/recipes/?limit=10')
+        if not options['compare']:
+            self.report(
+                options['url'], self.run(options['url'], paths, options)
+            )
+            return
+        url = f'http://127.0.0.1:{options["port"]}'
+        for mode in MODES:
+            server = self.start_server(mode, options)
+            try:
+                self.wait_for_server(url, server, options['host'])
+                self.report(mode, self.run(url, paths, options))
+            finally:
+                server.terminate()
+                server.wait()
+
+    def start_server(self, mode, options):
+        env = dict(
+            os.environ,
+            SERVER_MODE=mode,
+            ASYNC_API=str(mode == 'asgi'),
+            GUNICORN_WORKERS=str(options['workers']),
+            GUNICORN_BIND=f'127.0.0.1:{options["port"]}',
+        )
+        return subprocess.Popen(
+            [
+                shutil.which(
+                    'gunicorn', path=os.path.dirname(sys.executable)
+                ) or 'gunicorn',
+                '-c', 'gunicorn.conf.py',
+                f'foodgram.{mode}:application',
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @staticmethod
+    def wait_for_server(url, server, host, timeout=30):
+        address = urlsplit(url)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер завершился при запуске')
+            try:
+                connection = http.client.HTTPConnection(
+                    address.hostname, address.port, timeout=1
+                )
+                connection.request(
+                    'GET', '/api/tags/', headers={'Host': host}
+                )
+                connection.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('Сервер не запустился')
+
+    def run(self, url, paths, options):
+        address = urlsplit(url)
+        headers = {'Host': options['host']}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        local = threading.local()
+
+        def send(index):
+            if not hasattr(local, 'connection'):
+                local.connection = http.client.HTTPConnection(
+                    address.hostname, address.port, timeout=30
+                )
+            started = time.perf_counter()
+            try:
+                local.connection.request(
+                    'GET', paths[index % len(paths)], headers=headers
+                )
+                response = local.connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                local.connection.close()
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(send, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return elapsed, results
+
+    def report(self, name, result):
+        elapsed, results = result
+        timings = [timing for timing, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        self.stdout.write(
+            '{:<6} запросов: {}  ошибок: {}  {:.1f} запр/с  '
+            'p50: {:.1f} мс  p95: {:.1f} мс  p99: {:.1f} мс'.format(
+                name,
+                len(results),
+                errors,
+                len(results) / elapsed,
+                percentile(timings, 50) * 1000,
+                percentile(timings, 95) * 1000,
+                percentile(timings, 99) * 1000,
+            )
+        )
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from .connections import connection_stats
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Метрики текущего запроса. Контекст копируется в потоки sync_to_async,
+# поэтому SQL-запросы учитываются и в пуле потоков под ASGI.
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    '''Метрики одного запроса: SQL-запросы, время сериализации и ответа'''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.serializer_name = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        '''Обертка для connection.execute_wrapper'''
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.queries += 1
+                self.sql_time += time.perf_counter() - started
+                self.statements[sql] += 1
+
+    @property
+    def duplicate_queries(self):
+        '''Число повторов одинаковых запросов - признак N+1'''
+        return sum(count - 1 for count in self.statements.values())
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+
+def record_query(execute, sql, params, many, context):
+    '''Обертка SQL-запросов соединения для метрик текущего запроса'''
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    # В начало списка: connection.execute_wrapper() снимает последнюю
+    # обертку, и соединение, открытое внутри него, не должно ее сдвинуть.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class MetricsRegistry:
+    '''Накопительные метрики процесса в формате Prometheus с меткой pid'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._totals = defaultdict(Counter)
+        self._buckets = defaultdict(Counter)
+
+    def observe(self, metrics, status, size):
+        view = metrics.view_name or 'unknown'
+        duration = metrics.duration
+        with self._lock:
+            self._requests[(view, str(status))] += 1
+            totals = self._totals[view]
+            totals['duration'] += duration
+            totals['count'] += 1
+            totals['queries'] += metrics.queries
+            totals['sql_time'] += metrics.sql_time
+            totals['duplicate_queries'] += metrics.duplicate_queries
+            totals['serializer_time'] += metrics.serializer_time
+            totals['bytes'] += size
+            buckets = self._buckets[view]
+            for bucket in DURATION_BUCKETS:
+                if duration <= bucket:
+                    buckets[bucket] += 1
+
+    def render(self):
+        with self._lock:
+            requests = dict(self._requests)
+            totals = {
+                view: dict(values) for view, values in self._totals.items()
+            }
+            buckets = {
+                view: dict(values) for view, values in self._buckets.items()
+            }
+        # Каждый воркер gunicorn отдает только свои счетчики, метка pid
+        # разделяет их ряды: суммировать - sum without (pid).
+        pid = f'pid="{os.getpid()}"'
+        lines = [
+            '# HELP foodgram_http_requests_total Обработанные запросы.',
+            '# TYPE foodgram_http_requests_total counter',
+        ]
+        for (view, status), value in sorted(requests.items()):
+            lines.append(
+                f'foodgram_http_requests_total'
+                f'{{{pid},view="{view}",status="{status}"}} {value}'
+            )
+        lines += [
+            '# HELP foodgram_http_request_duration_seconds Время ответа.',
+            '# TYPE foodgram_http_request_duration_seconds histogram',
+        ]
+        for view, values in sorted(totals.items()):
+            for bucket in DURATION_BUCKETS:
+                lines.append(
+                    f'foodgram_http_request_duration_seconds_bucket'
+                    f'{{{pid},view="{view}",le="{bucket}"}} '
+                    f'{buckets[view].get(bucket, 0)}'
+                )
+            lines += [
+                f'foodgram_http_request_duration_seconds_bucket'
+                f'{{{pid},view="{view}",le="+Inf"}} {values["count"]}',
+                f'foodgram_http_request_duration_seconds_sum'
+                f'{{{pid},view="{view}"}} {values["duration"]:.6f}',
+                f'foodgram_http_request_duration_seconds_count'
+                f'{{{pid},view="{view}"}} {values["count"]}',
+            ]
+        for name, key, help_text in (
+            ('db_queries_total', 'queries', 'SQL-запросы.'),
+            ('db_query_duration_seconds_total', 'sql_time',
+             'Время SQL-запросов.'),
+            ('db_duplicate_queries_total', 'duplicate_queries',
+             'Повторы одинаковых SQL-запросов.'),
+            ('serializer_duration_seconds_total', 'serializer_time',
+             'Время сериализации.'),
+            ('response_bytes_total', 'bytes', 'Размер ответов.'),
+        ):
+            lines += [
+                f'# HELP foodgram_{name} {help_text}',
+                f'# TYPE foodgram_{name} counter',
+            ]
+            for view, values in sorted(totals.items()):
+                value = values[key]
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(
+                    f'foodgram_{name}{{{pid},view="{view}"}} {value}'
+                )
+        lines += [
+            '# HELP foodgram_db_connections_total Соединения с базой.',
+            '# TYPE foodgram_db_connections_total counter',
+        ]
+        for name, value in connection_stats.snapshot().items():
+            lines.append(
+                f'foodgram_db_connections_total'
+                f'{{{pid},event="{name}"}} {value}'
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+from django.conf import settings
+
+from .metrics import RequestMetrics, current_metrics, registry
+
+logger = logging.getLogger(__name__)
+
+
+def get_view_name(request, view_func):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+class RequestMetricsMiddleware:
+    '''Считает SQL-запросы, время сериализации и размер ответа.
+
+    Результат отдается в заголовке Server-Timing, накапливается для
+    /api/metrics/ и пишется в лог, если запрос вышел за REQUEST_BUDGETS.
+    '''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Как в MiddlewareMixin: под ASGI Django должен видеть в
+            # экземпляре корутину и не переводить цепочку в синхронный поток.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, metrics, response)
+
+    async def __acall__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, metrics, response)
+
+    def finish(self, request, metrics, response):
+        size = 0 if response.streaming else len(response.content)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = self.get_server_timing(metrics)
+        registry.observe(metrics, response.status_code, size)
+        self.check_budgets(request, metrics, size)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics.view_name = get_view_name(request, view_func)
+
+    @staticmethod
+    def get_server_timing(metrics):
+        return ', '.join((
+            f'db;dur={metrics.sql_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries, '
+            f'{metrics.duplicate_queries} duplicates"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={metrics.duration * 1000:.1f}',
+        ))
+
+    @staticmethod
+    def check_budgets(request, metrics, size):
+        budgets = settings.REQUEST_BUDGETS
+        exceeded = [
+            f'{name}={value} (бюджет {budgets[name]})'
+            for name, value in (
+                ('queries', metrics.queries),
+                ('duplicate_queries', metrics.duplicate_queries),
+                ('duration_ms', round(metrics.duration * 1000)),
+                ('bytes', size),
+            )
+            if budgets.get(name) is not None and value > budgets[name]
+        ]
+        if not exceeded:
+            return
+        sql, repeats = metrics.most_repeated()
+        logger.warning(
+            'Превышен бюджет запроса %s %s: %s; view=%s serializer=%s; '
+            'самый частый SQL (%s раз): %s',
+            request.method,
+            request.get_full_path(),
+            ', '.join(exceeded),
+            metrics.view_name,
+            metrics.serializer_name,
+            repeats,
+            sql,
+        )
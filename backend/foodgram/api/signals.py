@@ -0,0 +1,47 @@
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Ingredient, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from . import connections
+from .metrics import install_query_recorder
+from .v1.authentication import revoke_tokens, revoke_user_tokens
+from .v1.cache import invalidate_cache
+
+CACHE_NAMESPACES = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_api_cache(sender, **kwargs):
+    invalidate_cache(CACHE_NAMESPACES[sender])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    revoke_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(connection_created)
+def count_created_connection(sender, connection, **kwargs):
+    connections.connection_created(connection)
+    install_query_recorder(connection)
+
+
+@receiver(request_started)
+def check_db_connections(sender, **kwargs):
+    connections.request_started()
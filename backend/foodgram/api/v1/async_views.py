@@ -0,0 +1,33 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def run_in_thread_pool(view):
+    '''Оборачивает синхронное DRF-представление в асинхронное.
+
+    В Django 3.2 нет асинхронного ORM, а DRF не поддерживает асинхронные
+    представления, поэтому под ASGI все синхронные представления
+    выполняются по очереди в одном потоке. Обернутое представление
+    выполняется в общем пуле потоков, и запросы к нему обрабатываются
+    параллельно. Соединения с базой в потоках пула закрываются так же,
+    как это делают сигналы начала и конца запроса.
+    '''
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    run_async = sync_to_async(run, thread_sensitive=False)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run_async(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,107 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def get_revocation_key(key):
+    return f'auth:token:{key}:revoked'
+
+
+class TokenCache:
+    '''Ограниченный LRU-кэш токенов с временем жизни записей.
+
+    Кэш живет в памяти процесса. Чтобы выход и смена пароля действовали
+    во всех процессах, запись хранит метку отзыва токена из общего кэша
+    Django, прочитанную до загрузки токена из базы, и при несовпадении
+    с текущей меткой считается устаревшей.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, token, revoked = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if cache.get(get_revocation_key(key)) != revoked:
+            self.invalidate(key)
+            return None
+        return token
+
+    def set(self, key, token, revoked):
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_TTL, token, revoked
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key, (_, token, _) in list(self._entries.items()):
+                if token.user_id == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def revoke_tokens(keys):
+    '''Сбрасывает закэшированные токены во всех процессах'''
+    keys = list(keys)
+    for key in keys:
+        token_cache.invalidate(key)
+    # Метки меняются после коммита, когда другие процессы уже не прочитают
+    # удаленный токен из базы. Записи живут не дольше TOKEN_CACHE_TTL,
+    # дольше хранить метки незачем.
+    revoked = time.time_ns()
+    transaction.on_commit(lambda: cache.set_many(
+        {get_revocation_key(key): revoked for key in keys},
+        timeout=settings.TOKEN_CACHE_TTL
+    ))
+
+
+def revoke_user_tokens(user_id):
+    token_cache.invalidate_user(user_id)
+    revoke_tokens(Token.objects.filter(
+        user=user_id
+    ).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''TokenAuthentication, не обращающаяся к базе для известных токенов'''
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            # Метку читаем до запроса к базе: если токен удалят после
+            # чтения из базы, метка успеет смениться и запись устареет.
+            revoked = cache.get(get_revocation_key(key))
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token, revoked)
+        # Каждый запрос получает свою копию пользователя, чтобы изменения
+        # request.user не попадали в кэш.
+        return copy.copy(token.user), token
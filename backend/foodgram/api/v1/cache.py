@@ -0,0 +1,86 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_version_key(namespace):
+    return f'api:{namespace}:version'
+
+
+def get_cache_version(namespace):
+    # Начальная версия берется из времени, чтобы после вытеснения ключа
+    # из кэша не вернуться к уже использованной версии. В локальном кэше
+    # версия живет ограниченное время: ETag воркера, не получившего сигнал,
+    # со временем сменится, и он перестанет отвечать 304 на старые данные.
+    return cache.get_or_set(
+        get_version_key(namespace),
+        time.time_ns(),
+        timeout=settings.API_CACHE_VERSION_TIMEOUT
+    )
+
+
+def invalidate_cache(namespace):
+    try:
+        cache.incr(get_version_key(namespace))
+    except ValueError:
+        cache.set(
+            get_version_key(namespace),
+            time.time_ns(),
+            timeout=settings.API_CACHE_VERSION_TIMEOUT
+        )
+
+
+class CachedResponseMixin:
+    '''Кэширует ответы list и retrieve, не зависящие от пользователя.
+
+    Ключ кэша включает версию пространства имен, которую сбрасывают
+    сигналы при изменении моделей. Та же версия используется в ETag,
+    поэтому повторный запрос с If-None-Match получает 304. Ключ и ETag
+    зависят от выбранного формата ответа, а сам ответ - от заголовка
+    Accept, о чем сообщает Vary.
+    '''
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        version = get_cache_version(self.cache_namespace)
+        path_hash = hashlib.md5('{} {}'.format(
+            request.accepted_media_type, request.get_full_path()
+        ).encode()).hexdigest()
+        etag = f'"{version}-{path_hash[:16]}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            key = f'api:{self.cache_namespace}:{version}:{path_hash}'
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                cache.set(
+                    key,
+                    data,
+                    settings.API_CACHE_TIMEOUTS[self.cache_namespace]
+                )
+            response = Response(data)
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept',))
+        patch_cache_control(
+            response, public=True, max_age=settings.API_CACHE_MAX_AGE
+        )
+        return response
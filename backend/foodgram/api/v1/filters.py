@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django_filters import (CharFilter, FilterSet, ModelChoiceFilter,
                             ModelMultipleChoiceFilter)
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, RecipeIngredients, Tag
+from recipes.search import search_recipes
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
 
 User = get_user_model()
 
@@ -24,7 +28,49 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
     )
     author = ModelChoiceFilter(queryset=User.objects.all())
+    ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='filter_ingredients',
+    )
+    search = CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author')
+        fields = ('tags', 'author', 'ingredients', 'search')
+
+    def filter_ingredients(self, queryset, name, value):
+        '''Рецепты, в которых есть все перечисленные ингредиенты'''
+        if not value:
+            return queryset
+        return queryset.filter(pk__in=RecipeIngredients.objects.filter(
+            ingredient__in=value
+        ).values('recipe').annotate(
+            matched=Count('ingredient', distinct=True)
+        ).filter(matched=len(value)).values('recipe'))
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        top = None
+        if self.request is not None:
+            # Поиск всегда листается по limit/offset: ранг нужен только
+            # рецептам до конца запрошенной страницы.
+            paginator = LimitOffsetPagination()
+            top = (
+                paginator.get_offset(self.request)
+                + (paginator.get_limit(self.request) or 0)
+            )
+        return search_recipes(queryset, value, top)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    '''При поиске по умолчанию сортирует рецепты по релевантности'''
+
+    def get_default_ordering(self, view):
+        if self.get_search_query(view.request):
+            return ('-rank', ) + tuple(super().get_default_ordering(view))
+        return super().get_default_ordering(view)
+
+    @staticmethod
+    def get_search_query(request):
+        return request.query_params.get('search', '').strip()
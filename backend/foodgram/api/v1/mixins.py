@@ -1,7 +1,70 @@
+import time
+
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+
+class SerializerTimingMixin:
+    '''Учитывает время сериализации ответа в метриках запроса'''
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = getattr(self.request, 'metrics', None)
+        if metrics is None:
+            return serializer
+        metrics.serializer_name = type(
+            getattr(serializer, 'child', serializer)
+        ).__name__
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            started = time.perf_counter()
+            try:
+                return to_representation(instance)
+            finally:
+                metrics.serializer_time += time.perf_counter() - started
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+
+class ValuesListMixin:
+    '''Отдает list через сериализатор строк queryset.values()'''
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.values_serializer_class(
+            context=self.get_serializer_context()
+        )
+        queryset = serializer.get_values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        data = self.serialize_values(
+            serializer, list(queryset) if page is None else page
+        )
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def serialize_values(self, serializer, rows):
+        metrics = getattr(self.request, 'metrics', None)
+        if metrics is None:
+            return serializer.serialize(rows)
+        metrics.serializer_name = type(serializer).__name__
+        started = time.perf_counter()
+        try:
+            return serializer.serialize(rows)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+class ModelViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
+    pass
 
 
 class CreateListDestroyViewSet(
+    SerializerTimingMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -11,6 +74,7 @@ class CreateListDestroyViewSet(
 
 
 class ListViewSet(
+    SerializerTimingMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
@@ -18,6 +82,7 @@ class ListViewSet(
 
 
 class RetrieveListViewSet(
+    SerializerTimingMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
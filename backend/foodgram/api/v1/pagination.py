@@ -0,0 +1,145 @@
+from django.utils.dateparse import parse_datetime
+from recipes.models import FeedEntry
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, Cursor,
+                                       CursorPagination, LimitOffsetPagination)
+
+
+class RecipeCursorPagination(CursorPagination):
+    '''Курсорная пагинация рецептов по дате публикации'''
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+    '''Курсорная пагинация ленты по индексу FeedEntry.
+
+    Без фильтров страница собирается из ключей (pub_date, id) ленты, и
+    рецепты загружаются по id. Курсор хранит оба поля, поэтому рецепты
+    с одинаковой датой не требуют OFFSET. С фильтрами лента листается
+    как обычный список рецептов.
+    '''
+    timeline_params = frozenset(('cursor', 'page_size', 'format'))
+    timeline = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.timeline = set(request.query_params) <= self.timeline_params
+        if not self.timeline:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.reverse)
+        position = cursor and self.decode_position(cursor.position)
+        keys = FeedEntry.timeline(
+            request.user, self.page_size + 1, position, reverse
+        )
+        has_more = len(keys) > self.page_size
+        keys = keys[:self.page_size]
+        if reverse:
+            keys.reverse()
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else position is not None
+        self.next_link = self.get_timeline_link(
+            keys[-1] if keys else position, False, has_next
+        )
+        self.previous_link = self.get_timeline_link(
+            keys[0] if keys else position, True, has_previous
+        )
+        self.display_page_controls = bool(self.next_link or self.previous_link)
+        ids = [pk for _, pk in keys]
+        rows = {
+            row['id'] if isinstance(row, dict) else row.pk: row
+            for row in queryset.filter(pk__in=ids)
+        }
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def get_timeline_link(self, key, reverse, exists):
+        if not exists or key is None:
+            return None
+        pub_date, pk = key
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=reverse, position=f'{pub_date.isoformat()}_{pk}'
+        ))
+
+    def decode_position(self, position):
+        pub_date, _, pk = (position or '').rpartition('_')
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, int(pk)
+
+    def get_next_link(self):
+        if self.timeline:
+            return self.next_link
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.timeline:
+            return self.previous_link
+        return super().get_previous_link()
+
+
+class FollowCursorPagination(CursorPagination):
+    '''Курсорная пагинация подписок в порядке их оформления'''
+    ordering = ('-id', )
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CursorOrLimitOffsetPagination(BasePagination):
+    '''Курсорная пагинация без COUNT и OFFSET.
+
+    Если в запросе передан limit или offset, используется прежняя
+    пагинация LimitOffsetPagination, на которую рассчитан фронтенд.
+    '''
+    cursor_pagination_class = RecipeCursorPagination
+    limit_offset_params = ('limit', 'offset')
+    paginator = None
+
+    @property
+    def display_page_controls(self):
+        return bool(self.paginator and self.paginator.display_page_controls)
+
+    def get_paginator(self, request):
+        if any(param in request.query_params
+               for param in self.limit_offset_params):
+            return LimitOffsetPagination()
+        return self.cursor_pagination_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return (
+            LimitOffsetPagination().get_schema_fields(view)
+            + self.cursor_pagination_class().get_schema_fields(view)
+        )
+
+
+class RecipePagination(CursorOrLimitOffsetPagination):
+    cursor_pagination_class = RecipeCursorPagination
+    limit_offset_params = ('limit', 'offset', 'search')
+
+
+class FollowPagination(CursorOrLimitOffsetPagination):
+    cursor_pagination_class = FollowCursorPagination
+
+
+class FeedPagination(CursorOrLimitOffsetPagination):
+    cursor_pagination_class = FeedCursorPagination
+    limit_offset_params = ('limit', 'offset', 'search')
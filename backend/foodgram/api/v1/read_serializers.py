@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from django.db import models
+from django.db.models import Exists, OuterRef, Value
+from recipes.models import Recipe, RecipeIngredients
+from users.models import Follow
+
+from .serializers import build_url, get_image_renditions
+
+
+class ValuesSerializer:
+    '''Сериализатор списков только для чтения.
+
+    Строит словари прямо из строк queryset.values(), не создавая объекты
+    моделей и поля DRF для каждого элемента.
+    '''
+    fields = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def get_values(self, queryset):
+        return queryset.values(*self.fields)
+
+    def to_representation(self, row):
+        return row
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class TagValuesSerializer(ValuesSerializer):
+    fields = ('id', 'name', 'color', 'slug')
+
+
+class IngredientValuesSerializer(ValuesSerializer):
+    fields = ('id', 'name', 'measurement_unit')
+
+
+class RecipeValuesSerializer(ValuesSerializer):
+    '''Список рецептов в том же виде, что и GetRecipeSerializer.
+
+    Теги и ингредиенты страницы загружаются двумя запросами по id рецептов.
+    '''
+    fields = (
+        'id',
+        'name',
+        'image',
+        'renditions',
+        'text',
+        'cooking_time',
+        'favorites_count',
+        'carts_count',
+        'pub_date',
+        'is_favorited',
+        'is_in_shopping_cart',
+        'author_id',
+        'author__email',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'author_is_subscribed',
+    )
+    image_storage = Recipe._meta.get_field('image').storage
+
+    def get_values(self, queryset):
+        user = self.context['request'].user
+        if user.is_authenticated:
+            is_subscribed = Exists(Follow.objects.filter(
+                user=user,
+                author=OuterRef('author')
+            ))
+        else:
+            is_subscribed = Value(False, models.BooleanField())
+        return queryset.prefetch_related(None).annotate(
+            author_is_subscribed=is_subscribed
+        ).values(*self.fields)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        recipe_ids = [row['id'] for row in rows]
+        self.tags = defaultdict(list)
+        for tag in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('tag_id').values(
+            'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+        ):
+            self.tags[tag['recipe_id']].append({
+                'id': tag['tag_id'],
+                'name': tag['tag__name'],
+                'color': tag['tag__color'],
+                'slug': tag['tag__slug'],
+            })
+        self.ingredients = defaultdict(list)
+        for ingredient in RecipeIngredients.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('pk').values(
+            'recipe_id',
+            'ingredient_id',
+            'amount',
+            'ingredient__measurement_unit',
+            'ingredient__name',
+        ):
+            self.ingredients[ingredient['recipe_id']].append({
+                'id': ingredient['ingredient_id'],
+                'amount': ingredient['amount'],
+                'measurement_unit': ingredient['ingredient__measurement_unit'],
+                'name': ingredient['ingredient__name'],
+            })
+        return super().serialize(rows)
+
+    def to_representation(self, row):
+        request = self.context.get('request')
+        image = row['image']
+        return {
+            'id': row['id'],
+            'tags': self.tags[row['id']],
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': row['author_is_subscribed'],
+            },
+            'ingredients': self.ingredients[row['id']],
+            'is_favorited': row['is_favorited'],
+            'is_in_shopping_cart': row['is_in_shopping_cart'],
+            'name': row['name'],
+            'image': build_url(
+                request, self.image_storage.url(image)
+            ) if image else None,
+            'image_renditions': get_image_renditions(
+                row['renditions'], image, request
+            ),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+            'favorites_count': row['favorites_count'],
+            'carts_count': row['carts_count'],
+        }
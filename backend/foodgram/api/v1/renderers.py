@@ -0,0 +1,62 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''JSON-рендерер на orjson, если он установлен.
+
+    Без orjson работает как стандартный JSONRenderer. Типы, которые orjson
+    не знает (ленивые строки, Decimal и т.п.), кодируются энкодером DRF.
+    '''
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b''
+        option = orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(
+            data, default=self.encoder_class().default, option=option
+        )
+
+
+class PlainTextRenderer(BaseRenderer):
+    '''Рендерер для выгрузки данных в текстовом виде'''
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, bytes):
+            return data
+        return self.to_text(data).encode(self.charset)
+
+    @classmethod
+    def to_text(cls, data):
+        '''Ошибки и прочие данные в виде читаемого текста, а не repr'''
+        if isinstance(data, dict):
+            return '\n'.join(
+                text if key == 'detail' else f'{key}: {text}'
+                for key, text in (
+                    (key, cls.to_text(value)) for key, value in data.items()
+                )
+            )
+        if isinstance(data, (list, tuple)):
+            return '\n'.join(cls.to_text(item) for item in data)
+        return str(data)
+
+
+class CSVRenderer(PlainTextRenderer):
+    '''Рендерер для выгрузки данных в формате CSV'''
+    media_type = 'text/csv'
+    format = 'csv'
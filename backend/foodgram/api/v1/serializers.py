@@ -1,15 +1,38 @@
-from django.contrib.auth.hashers import check_password, make_password
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
-                            ShoppingCart, Tag)
+from recipes.models import Ingredient, Recipe, RecipeIngredients, Tag
+from recipes.signals import recipe_ingredients_changed
 from rest_framework import serializers
 from users.models import Follow, User
 
 from .validators import username_validator
 
 
+def build_url(request, url):
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def get_image_renditions(renditions, image_name, request):
+    '''Ссылки на уменьшенные копии, если они созданы для текущего фото'''
+    if renditions.get('source') != image_name:
+        return {}
+    return {
+        size: {
+            extension: build_url(request, default_storage.url(name))
+            for extension, name in formats.items()
+        }
+        for size, formats in renditions.items()
+        if size != 'source'
+    }
+
+
 class UserSerializer(serializers.ModelSerializer):
     '''Сериализатор для работы с пользователями'''
     username = serializers.CharField(
@@ -47,6 +70,8 @@ class UserSerializer(serializers.ModelSerializer):
         return data
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(
             user=self.context.get('request').user,
             author=obj
@@ -88,12 +113,12 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
-    '''Сериализатор для работы с ингредиентами рецепта'''
+    '''Сериализатор для работы с ингредиентами рецепта.
+
+    Ингредиенты по id ищет RecipeSerializer.validate одним запросом.
+    '''
     amount = serializers.IntegerField()
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(source='ingredient_id', min_value=1)
     recipe = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
@@ -131,34 +156,25 @@ class GetRecipeSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        if user.is_anonymous or not request:
-            return False
-        return Favorite.objects.filter(
-            user=user,
-            recipe=obj
-        ).exists()
+        return obj.is_favorited
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        if user.is_anonymous or not request:
-            return False
-        return ShoppingCart.objects.filter(
-            user=user,
-            recipe=obj
-        ).exists()
+        return obj.is_in_shopping_cart
 
     def get_ingredients(self, obj):
-        recipe_ingredients = RecipeIngredients.objects.filter(recipe=obj)
         return GetRecipeIngredientsSerializer(
-            recipe_ingredients,
+            obj.recipeingredients_set.all(),
             many=True
         ).data
 
+    def get_image_renditions(self, obj):
+        return get_image_renditions(
+            obj.renditions, obj.image.name, self.context.get('request')
+        )
+
     class Meta:
         model = Recipe
         fields = (
@@ -170,8 +186,11 @@ class GetRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time',
+            'favorites_count',
+            'carts_count',
         )
 
 
@@ -179,6 +198,10 @@ class RecipeSerializer(serializers.ModelSerializer):
     '''Сериализатор для работы с рецептами'''
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientsSerializer(many=True)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
     image = Base64ImageField(max_length=None, use_url=True)
 
     class Meta:
@@ -194,21 +217,59 @@ class RecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    @staticmethod
+    def resolve_ids(model, ids, duplicate_message, missing_message):
+        '''Находит объекты по списку id одним запросом.
+
+        Возвращает объекты в порядке id и список ошибок, в которых
+        перечислены все повторяющиеся и все ненайденные id.
+        '''
+        counts = Counter(ids)
+        duplicates = [pk for pk, count in counts.items() if count > 1]
+        objects = model.objects.in_bulk(list(counts))
+        missing = [pk for pk in counts if pk not in objects]
+        errors = [
+            message.format(', '.join(map(str, pks)))
+            for message, pks in (
+                (duplicate_message, duplicates),
+                (missing_message, missing),
+            )
+            if pks
+        ]
+        if errors:
+            return None, errors
+        return [objects[pk] for pk in ids], []
+
     def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
-        ingredients_list = [ingredient['id'] for ingredient in ingredients]
-        if len(ingredients_list) != len(set(ingredients_list)):
-            raise serializers.ValidationError(
-                'Один из ингредиентов повторяется несколько раз!'
+        errors = {}
+        if 'ingredients' in data:
+            ingredients, errors['ingredients'] = self.resolve_ids(
+                Ingredient,
+                [item['ingredient_id'] for item in data['ingredients']],
+                'Ингредиенты повторяются: {}',
+                'Ингредиенты не найдены: {}'
             )
-        tags = self.initial_data.get('tags')
-        tags_list = [tag for tag in tags]
-        if len(tags_list) != len(set(tags_list)):
-            raise serializers.ValidationError(
-                'Один из тегов повторяется несколько раз!'
+            if ingredients is not None:
+                data['ingredients'] = [
+                    {'ingredient': ingredient, 'amount': item['amount']}
+                    for ingredient, item in zip(
+                        ingredients, data['ingredients']
+                    )
+                ]
+        if 'tags' in data:
+            tags, errors['tags'] = self.resolve_ids(
+                Tag,
+                data['tags'],
+                'Теги повторяются: {}',
+                'Теги не найдены: {}'
             )
+            data['tags'] = tags
+        errors = {field: error for field, error in errors.items() if error}
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -226,32 +287,78 @@ class RecipeSerializer(serializers.ModelSerializer):
         RecipeIngredients.objects.bulk_create(list_generation_data)
         return recipe
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients_data):
+        '''Меняет только добавленные, измененные и удаленные ингредиенты'''
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredients.objects.filter(
+                recipe=recipe
+            ).select_for_update()
+        }
+        old_amounts = {
+            ingredient: recipe_ingredient.amount
+            for ingredient, recipe_ingredient in existing.items()
+        }
+        new_amounts = {
+            ingredient_data['ingredient'].pk: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        if new_amounts == old_amounts:
+            return
+        removed = [
+            recipe_ingredient.pk
+            for ingredient, recipe_ingredient in existing.items()
+            if ingredient not in new_amounts
+        ]
+        created = []
+        changed = []
+        for ingredient, amount in new_amounts.items():
+            recipe_ingredient = existing.get(ingredient)
+            if recipe_ingredient is None:
+                created.append(RecipeIngredients(
+                    recipe=recipe,
+                    ingredient_id=ingredient,
+                    amount=amount
+                ))
+            elif recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if removed:
+            RecipeIngredients.objects.filter(pk__in=removed).delete()
+        RecipeIngredients.objects.bulk_create(created)
+        RecipeIngredients.objects.bulk_update(changed, ['amount'])
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            recipe=recipe,
+            old_amounts=old_amounts,
+            new_amounts=new_amounts
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        if 'tags' in self.validated_data:
-            tags_data = validated_data.pop('tags')
-            instance.tags.set(tags_data)
-        if 'ingredients' in self.validated_data:
-            ingredients_data = validated_data.pop('ingredients')
-            with transaction.atomic():
-                amount_set = RecipeIngredients.objects.filter(
-                    recipe__id=instance.id)
-                amount_set.delete()
-                bulk_create_data = (
-                    RecipeIngredients(
-                        recipe=instance,
-                        ingredient=ingredient_data['ingredient'],
-                        amount=ingredient_data['amount'])
-                    for ingredient_data in ingredients_data
-                )
-                RecipeIngredients.objects.bulk_create(bulk_create_data)
-        return super().update(instance, validated_data)
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data.pop('tags'))
+        if 'ingredients' in validated_data:
+            self.update_ingredients(
+                instance, validated_data.pop('ingredients')
+            )
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if validated_data:
+            # Сохраняются только переданные поля, чтобы не пересчитывать
+            # поисковый вектор и уменьшенные копии фото без необходимости.
+            instance.save(update_fields=list(validated_data))
+        return instance
 
     def to_representation(self, instance):
         self.fields.pop('ingredients')
         self.fields.pop('tags')
         representation = super().to_representation(instance)
         representation['ingredients'] = GetRecipeIngredientsSerializer(
-            RecipeIngredients.objects.filter(recipe=instance),
+            RecipeIngredients.objects.filter(
+                recipe=instance
+            ).select_related('ingredient'),
             many=True
         ).data
         representation['tags'] = TagSerializer(
@@ -274,13 +381,34 @@ class SignInSerializer(serializers.Serializer):
 
     def validate(self, data):
         user = get_object_or_404(User, email=data['email'])
-        if check_password(data['password'], user.password):
+        if user.check_password(data['password']):
+            data['user'] = user
             return data
         raise serializers.ValidationError(
             {'password': 'Неверный пароль'}
         )
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    '''Сериализатор списка рецептов для пакетных операций'''
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_recipes(self, value):
+        recipe_ids = list(dict.fromkeys(value))
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        missing = [recipe_id for recipe_id in recipe_ids
+                   if recipe_id not in recipes]
+        if missing:
+            raise serializers.ValidationError(
+                f'Рецепты не найдены: {missing}'
+            )
+        return [recipes[recipe_id] for recipe_id in recipe_ids]
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     '''Сериализатор для смены пароля'''
     new_password = serializers.CharField(
@@ -329,19 +457,23 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_recipes(self, obj):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[:int(limit)]
-        return ShortRecipeSerializer(queryset, many=True).data
+        queryset = getattr(obj.author, 'latest_recipes', None)
+        if queryset is None:
+            queryset = Recipe.objects.filter(author=obj.author)
+            if limit and limit.isdigit():
+                queryset = queryset[:int(limit)]
+        return ShortRecipeSerializer(
+            queryset, many=True, context=self.context
+        ).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is None:
+            return Recipe.objects.filter(author=obj.author).count()
+        return recipes_count
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(
-            user=obj.user,
-            author=obj.author
-        ).exists()
+        return True
 
     def validate(self, data):
         request = self.context.get('request')
@@ -364,6 +496,12 @@ class FollowSerializer(serializers.ModelSerializer):
 class ShortRecipeSerializer(serializers.ModelSerializer):
     '''Сериализатор для получения краткой информации о рецепте'''
     image = Base64ImageField()
+    image_renditions = serializers.SerializerMethodField()
+
+    def get_image_renditions(self, obj):
+        return get_image_renditions(
+            obj.renditions, obj.image.name, self.context.get('request')
+        )
 
     class Meta:
         model = Recipe
@@ -371,5 +509,6 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_renditions',
             'cooking_time'
         )
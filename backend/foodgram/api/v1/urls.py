@@ -1,9 +1,11 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import URLPattern, include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import run_in_thread_pool
 from .views import (FollowViewSet, IngredientViewSet, RecipeViewSet,
                     SubscriptionsListViewSet, TagViewSet, UserViewSet,
-                    get_token, logout)
+                    get_token, logout, metrics)
 
 router = DefaultRouter()
 router.register(
@@ -22,9 +24,33 @@ router.register(
     basename='subscribe'
 )
 
+ASYNC_ROUTES = {
+    'tag-list',
+    'tag-detail',
+    'ingredient-list',
+    'ingredient-detail',
+    'recipe-list',
+    'recipe-detail',
+}
+
+
+def get_router_urls():
+    if not settings.ASYNC_API:
+        return router.urls
+    return [
+        URLPattern(
+            url.pattern,
+            run_in_thread_pool(url.callback),
+            url.default_args,
+            url.name
+        ) if url.name in ASYNC_ROUTES else url
+        for url in router.urls
+    ]
+
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(get_router_urls())),
     path('auth/token/login/', get_token, name='token'),
-    path('auth/token/logout/', logout, name='logout')
+    path('auth/token/logout/', logout, name='logout'),
+    path('metrics/', metrics, name='metrics'),
 ]
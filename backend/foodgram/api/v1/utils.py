@@ -1,36 +1,231 @@
+import csv
+import hashlib
+import json
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
-from recipes.models import Recipe
+from recipes.models import (Recipe, RecipeIngredients, ShoppingCart,
+                            ShoppingCartIngredient)
+from recipes.signals import COUNTERS, bulk_change
 from rest_framework import status
 from rest_framework.response import Response
+from users.models import Follow, User
+
+from .serializers import RecipeIdsSerializer, ShortRecipeSerializer
+
+
+def lock_user(user):
+    '''Блокирует строку пользователя до конца транзакции.
 
-from .serializers import ShortRecipeSerializer
+    Добавление и удаление рецептов сначала читают уже добавленные, а
+    затем меняют счетчики и корзину на разницу. Без блокировки два
+    одновременных запроса одного пользователя учли бы рецепт дважды.
+    '''
+    list(User.objects.select_for_update().filter(
+        pk=user.pk
+    ).values_list('pk', flat=True))
 
 
 def create_favorite_or_shopping_cart_obj(request, model, pk):
     recipe = get_object_or_404(Recipe, pk=pk)
     if request.method == 'POST':
-        if model.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).exists():
-            return Response(
-                f'{str(model)}: Рецепт уже добавлен!',
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        shopping_cart = model(user=request.user, recipe=recipe)
-        shopping_cart.save()
+        with transaction.atomic():
+            lock_user(request.user)
+            if model.objects.filter(
+                user=request.user,
+                recipe=recipe
+            ).exists():
+                return Response(
+                    f'{str(model)}: Рецепт уже добавлен!',
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            shopping_cart = model(user=request.user, recipe=recipe)
+            shopping_cart.save()
         data = ShortRecipeSerializer(recipe).data
         return Response(
             data,
             status=status.HTTP_201_CREATED
         )
-    shopping_cart_recipe = get_object_or_404(
-        model,
-        user=request.user,
-        recipe=recipe
-    )
-    shopping_cart_recipe.delete()
+    with transaction.atomic():
+        lock_user(request.user)
+        shopping_cart_recipe = get_object_or_404(
+            model,
+            user=request.user,
+            recipe=recipe
+        )
+        shopping_cart_recipe.delete()
     return Response(
         f'{str(model)}: Рецепт был удален',
         status=status.HTTP_204_NO_CONTENT
     )
+
+
+def update_after_bulk_change(model, user, recipe_ids, difference):
+    '''Пакетные операции обходят сигналы на каждый объект, поэтому
+    счетчики рецептов и содержимое корзины обновляются здесь'''
+    if not recipe_ids:
+        return
+    Recipe.change_counters(recipe_ids, COUNTERS[model], difference)
+    if model is ShoppingCart:
+        ShoppingCartIngredient.change_amounts(
+            [user.pk],
+            RecipeIngredients.get_total_amounts(recipe_ids),
+            sign=difference
+        )
+
+
+def add_recipes_to(model, user, recipes):
+    with transaction.atomic():
+        lock_user(user)
+        existing = set(model.objects.filter(
+            user=user,
+            recipe__in=recipes
+        ).values_list('recipe', flat=True))
+        added = [recipe for recipe in recipes if recipe.pk not in existing]
+        model.objects.bulk_create(
+            [model(user=user, recipe=recipe) for recipe in added],
+            ignore_conflicts=True
+        )
+        update_after_bulk_change(
+            model, user, [recipe.pk for recipe in added], 1
+        )
+    return added
+
+
+def remove_recipes_from(model, user, recipe_ids=None):
+    with transaction.atomic():
+        lock_user(user)
+        queryset = model.objects.filter(user=user)
+        if recipe_ids is not None:
+            queryset = queryset.filter(recipe__in=recipe_ids)
+        removed = list(
+            queryset.select_for_update().values_list('recipe', flat=True)
+        )
+        with bulk_change():
+            queryset.delete()
+        update_after_bulk_change(model, user, removed, -1)
+    return removed
+
+
+def change_recipes_batch(request, model):
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipes = serializer.validated_data['recipes']
+    if request.method == 'POST':
+        added = add_recipes_to(model, request.user, recipes)
+        return Response(
+            ShortRecipeSerializer(
+                added, many=True, context={'request': request}
+            ).data,
+            status=status.HTTP_201_CREATED
+        )
+    remove_recipes_from(
+        model, request.user, [recipe.pk for recipe in recipes]
+    )
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit and recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
+def get_subscriptions(user, recipes_limit=None):
+    '''Подписки пользователя с числом рецептов и последними рецептами'''
+    recipes = Recipe.objects.all()
+    if recipes_limit is not None:
+        recipes = recipes.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('pk')[:recipes_limit]
+        ))
+    return Follow.objects.filter(
+        user=user
+    ).select_related(
+        'author'
+    ).annotate(
+        recipes_count=Count('author__recipe_author')
+    ).prefetch_related(
+        Prefetch(
+            'author__recipe_author',
+            queryset=recipes,
+            to_attr='latest_recipes'
+        )
+    )
+
+
+UNIT_CONVERSIONS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+}
+
+
+def normalize_shopping_list(ingredients):
+    '''Переводит количества в базовые единицы и объединяет позиции.
+
+    Строки должны быть отсортированы по названию ингредиента, тогда
+    в памяти держатся только позиции одного ингредиента.
+    '''
+    current_name = None
+    totals = {}
+    for name, amount, unit in ingredients:
+        unit, factor = UNIT_CONVERSIONS.get(unit, (unit, 1))
+        if name != current_name:
+            for total_unit, total in totals.items():
+                yield current_name, total, total_unit
+            current_name = name
+            totals = {}
+        totals[unit] = totals.get(unit, 0) + amount * factor
+    for total_unit, total in totals.items():
+        yield current_name, total, total_unit
+
+
+class Echo:
+    '''Псевдобуфер для построчной записи CSV'''
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(ingredients):
+    for ingredient in ingredients:
+        yield '{} - {} {}. \n'.format(*ingredient)
+
+
+def shopping_list_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for ingredient in ingredients:
+        yield writer.writerow(ingredient)
+
+
+def shopping_list_json(ingredients):
+    separator = ''
+    yield '['
+    for name, amount, measurement_unit in ingredients:
+        yield separator + json.dumps(
+            {
+                'name': name,
+                'amount': amount,
+                'measurement_unit': measurement_unit,
+            },
+            ensure_ascii=False
+        )
+        separator = ', '
+    yield ']'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': shopping_list_txt,
+    'csv': shopping_list_csv,
+    'json': shopping_list_json,
+}
+
+
+def get_shopping_list_etag(ingredients, file_format):
+    digest = hashlib.md5(file_format.encode())
+    for ingredient in ingredients:
+        digest.update(repr(ingredient).encode())
+    return '"{}"'.format(digest.hexdigest())
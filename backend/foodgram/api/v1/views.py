@@ -1,32 +1,47 @@
-from django.contrib.auth.hashers import check_password
-from django.http import HttpResponse
+from api.metrics import registry
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
-                            ShoppingCart, Tag)
-from rest_framework import status, viewsets
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingCartIngredient, Tag)
+from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from users.models import Follow, User
 
-from .filters import IngredientFilter, RecipeFilter
-from .mixins import CreateListDestroyViewSet, ListViewSet, RetrieveListViewSet
+from .cache import CachedResponseMixin
+from .filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from .mixins import (CreateListDestroyViewSet, ListViewSet, ModelViewSet,
+                     RetrieveListViewSet, ValuesListMixin)
+from .pagination import FeedPagination, FollowPagination, RecipePagination
+from .read_serializers import (IngredientValuesSerializer,
+                               RecipeValuesSerializer, TagValuesSerializer)
+from .renderers import CSVRenderer, FastJSONRenderer, PlainTextRenderer
 from .serializers import (ChangePasswordSerializer, FollowSerializer,
                           GetRecipeSerializer, IngredientSerializer,
-                          RecipeSerializer, SignInSerializer, TagSerializer,
-                          UserSerializer)
-from .utils import create_favorite_or_shopping_cart_obj
+                          RecipeSerializer, ShortRecipeSerializer,
+                          SignInSerializer, TagSerializer, UserSerializer)
+from .utils import (SHOPPING_LIST_FORMATS, change_recipes_batch,
+                    create_favorite_or_shopping_cart_obj, get_recipes_limit,
+                    get_shopping_list_etag, get_subscriptions,
+                    normalize_shopping_list, remove_recipes_from)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ModelViewSet):
     '''Вьюсет для работы с пользователями'''
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = 'id'
     permission_classes = (AllowAny, )
 
+    def get_queryset(self):
+        return User.objects.with_is_subscribed(self.request.user)
+
     @action(
         methods=['get', ],
         detail=False,
@@ -45,9 +60,8 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = ChangePasswordSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         current_user = self.request.user
-        if not check_password(
-            serializer.validated_data['current_password'],
-            current_user.password
+        if not current_user.check_password(
+            serializer.validated_data['current_password']
         ):
             message = {'message': 'Неверный пароль!'}
             return Response(message, status=status.HTTP_400_BAD_REQUEST)
@@ -62,52 +76,75 @@ def get_token(request):
     '''Вью функция для получения токена авторизации'''
     serializer = SignInSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    email = serializer.validated_data['email']
-    user = get_object_or_404(User, email=email)
-    token, _ = Token.objects.get_or_create(user=user)
+    token, _ = Token.objects.get_or_create(
+        user=serializer.validated_data['user']
+    )
     return Response(
         {'auth_token': str(token)},
         status=status.HTTP_200_OK
     )
 
 
-class TagViewSet(RetrieveListViewSet):
+class TagViewSet(CachedResponseMixin, ValuesListMixin, RetrieveListViewSet):
     '''Вьюсет для работы с тегами'''
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    values_serializer_class = TagValuesSerializer
     permission_classes = (AllowAny, )
     pagination_class = None
+    cache_namespace = 'tags'
 
 
-class IngredientViewSet(RetrieveListViewSet):
+class IngredientViewSet(
+    CachedResponseMixin,
+    ValuesListMixin,
+    RetrieveListViewSet
+):
     '''Вьюсет для работы с ингредиентами'''
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    values_serializer_class = IngredientValuesSerializer
     permission_classes = (AllowAny, )
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    cache_namespace = 'ingredients'
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name and 'measurement_unit' not in request.query_params:
+            return Response(ingredient_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        return super().list(request, *args, **kwargs)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(ValuesListMixin, ModelViewSet):
     '''Вьюсет для работы с рецептами'''
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    values_serializer_class = RecipeValuesSerializer
     permission_classes = (IsAuthenticated, )
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('favorites_count', 'carts_count')
+    ordering = ('-pub_date', '-id')
+    pagination_class = RecipePagination
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Recipe.objects.with_user_data(user)
+        if self.action == 'feed':
+            queryset = queryset.feed(user)
         is_favorited = self.request.query_params.get('is_favorited') or 0
         if int(is_favorited) == 1:
-            return Recipe.objects.filter(favorite_recipe__user=user)
+            return queryset.filter(is_favorited=True)
         is_in_shopping_cart = self.request.query_params.get(
             'is_in_shopping_cart'
         ) or 0
         if int(is_in_shopping_cart) == 1:
-            return Recipe.objects.filter(shopping_cart_recipe__user=user)
-        return Recipe.objects.all()
+            return queryset.filter(is_in_shopping_cart=True)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -133,17 +170,98 @@ class RecipeViewSet(viewsets.ModelViewSet):
             pk=pk
         )
 
+    @action(
+        detail=False,
+        methods=['get', ],
+        pagination_class=FeedPagination
+    )
+    def feed(self, request):
+        return self.list(request)
+
+    @staticmethod
+    def get_short_recipes(queryset):
+        return list(queryset.only(
+            'id', 'name', 'image', 'renditions', 'cooking_time'
+        )[:settings.RECOMMENDATIONS_TOP_K])
+
+    def get_short_recipes_response(self, recipes):
+        return Response(ShortRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(detail=True, methods=['get', ])
+    def similar(self, request, pk):
+        get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        return self.get_short_recipes_response(
+            self.get_short_recipes(Recipe.objects.similar_to(pk))
+        )
+
     @action(detail=False, methods=['get', ])
+    def recommended(self, request):
+        '''Рецепты, похожие на избранные, а без них - самые популярные'''
+        recipes = self.get_short_recipes(
+            Recipe.objects.recommended_for(request.user)
+        ) or self.get_short_recipes(
+            Recipe.objects.exclude(
+                favorite_recipe__user=request.user
+            ).order_by('-favorites_count', '-id')
+        )
+        return self.get_short_recipes_response(recipes)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-batch'
+    )
+    def favorite_batch(self, request):
+        return change_recipes_batch(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch'
+    )
+    def shopping_cart_batch(self, request):
+        return change_recipes_batch(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['post', ],
+        url_path='shopping_cart/clear',
+        url_name='shopping-cart-clear'
+    )
+    def clear_shopping_cart(self, request):
+        remove_recipes_from(ShoppingCart, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        renderer_classes=(PlainTextRenderer, CSVRenderer, FastJSONRenderer)
+    )
     def download_shopping_cart(self, request):
-        filename = 'shopping_list.txt'
-        user = request.user
-        shopping_list = RecipeIngredients.get_shopping_list(user=user)
-        response = HttpResponse(
-            shopping_list, content_type='text/plain; charset=UTF-8'
+        renderer = request.accepted_renderer
+        filename = 'shopping_list.{0}'.format(renderer.format)
+        ingredients = ShoppingCartIngredient.get_shopping_list(
+            user=request.user
         )
-        response['Content-Disposition'] = (
-            'attachment; filename={0}'.format(filename)
+        etag = get_shopping_list_etag(
+            ingredients.iterator(), renderer.format
         )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(
+                SHOPPING_LIST_FORMATS[renderer.format](
+                    normalize_shopping_list(ingredients.iterator())
+                ),
+                content_type='{0}; charset=utf-8'.format(renderer.media_type)
+            )
+            response['Content-Disposition'] = (
+                'attachment; filename={0}'.format(filename)
+            )
+        response['ETag'] = etag
         return response
 
 
@@ -153,8 +271,9 @@ class FollowViewSet(CreateListDestroyViewSet):
     serializer_class = FollowSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        return user.follower.all()
+        return get_subscriptions(
+            self.request.user, get_recipes_limit(self.request)
+        )
 
     def perform_create(self, serializer):
         author = get_object_or_404(User, pk=self.kwargs.get('id'))
@@ -179,9 +298,12 @@ class SubscriptionsListViewSet(ListViewSet):
     '''Вьюсет для получения всех подписок пользователя'''
     serializer_class = FollowSerializer
     permission_classes = (IsAuthenticated, )
+    pagination_class = FollowPagination
 
     def get_queryset(self):
-        return Follow.objects.filter(user=self.request.user)
+        return get_subscriptions(
+            self.request.user, get_recipes_limit(self.request)
+        )
 
 
 @api_view(['POST'])
@@ -189,3 +311,13 @@ class SubscriptionsListViewSet(ListViewSet):
 def logout(request):
     Token.objects.filter(user_id=request.user.id).delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def metrics(request):
+    '''Метрики процесса в текстовом формате Prometheus'''
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,17 +84,30 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_POOL_MODE=persistent держит соединения открытыми между запросами,
+# DB_POOL_MODE=pgbouncer подключается к pgbouncer в режиме transaction
+# pooling, где серверные курсоры недоступны.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', default='persistent')
+
+USE_PGBOUNCER = DB_POOL_MODE == 'pgbouncer'
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
-        'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'HOST': os.getenv('PGBOUNCER_HOST' if USE_PGBOUNCER else 'DB_HOST'),
+        'PORT': os.getenv('PGBOUNCER_PORT' if USE_PGBOUNCER else 'DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0 if USE_PGBOUNCER else 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': USE_PGBOUNCER,
     }
 }
 
+DB_HEALTH_CHECK_INTERVAL = int(os.getenv('DB_HEALTH_CHECK_INTERVAL', default=30))
+
+DB_STATS_LOG_INTERVAL = int(os.getenv('DB_STATS_LOG_INTERVAL', default=1000))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -114,6 +128,34 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'users.hashers.TunablePBKDF2PasswordHasher',
+    'argon2': 'users.hashers.TunableArgon2PasswordHasher',
+    'bcrypt': 'users.hashers.TunableBCryptSHA256PasswordHasher',
+}
+
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', default='pbkdf2')
+
+# Первым идет алгоритм для новых паролей, остальные нужны для проверки
+# старых хэшей, которые пересчитываются при следующем входе.
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', default=260000))
+
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', default=2))
+
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', default=102400))
+
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', default=8))
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', default=12))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -151,12 +193,87 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.v1.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.v1.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+# LocMemCache у каждого процесса свой: сигнал сбрасывает версию только в
+# том воркере, где произошло изменение. Без общего кэша ответы и версии
+# хранятся недолго, чтобы остальные воркеры подхватывали изменения.
+LOCAL_CACHE = CACHES['default']['BACKEND'].endswith('.LocMemCache')
+
+API_CACHE_DEFAULT_TIMEOUT = 5 * 60 if LOCAL_CACHE else 24 * 60 * 60
+
+API_CACHE_TIMEOUTS = {
+    'tags': int(os.getenv('TAGS_CACHE_TIMEOUT', default=API_CACHE_DEFAULT_TIMEOUT)),
+    'ingredients': int(os.getenv('INGREDIENTS_CACHE_TIMEOUT', default=API_CACHE_DEFAULT_TIMEOUT)),
+}
+
+API_CACHE_VERSION_TIMEOUT = API_CACHE_DEFAULT_TIMEOUT if LOCAL_CACHE else None
+
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', default=60))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', default=50))
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+
+# Под ASGI выполнять чтение тегов, ингредиентов и рецептов в пуле потоков.
+ASYNC_API = os.getenv('ASYNC_API', default='False') == 'True'
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', default='True') == 'True'
+
+# Запросы, превысившие любой из бюджетов, попадают в лог с именами
+# представления и сериализатора.
+REQUEST_BUDGETS = {
+    'queries': int(os.getenv('REQUEST_BUDGET_QUERIES', default=20)),
+    'duplicate_queries': int(os.getenv('REQUEST_BUDGET_DUPLICATE_QUERIES', default=5)),
+    'duration_ms': int(os.getenv('REQUEST_BUDGET_DURATION_MS', default=500)),
+    'bytes': int(os.getenv('REQUEST_BUDGET_BYTES', default=1000000)),
+}
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=60))
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+
+RECIPE_INDEX_TTL = int(os.getenv('RECIPE_INDEX_TTL', default=300))
+
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default=1000)
+)
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', default=100))
+
+RECOMMENDATIONS_TOP_K = int(os.getenv('RECOMMENDATIONS_TOP_K', default=20))
+RECOMMENDATIONS_INGREDIENT_WEIGHT = float(
+    os.getenv('RECOMMENDATIONS_INGREDIENT_WEIGHT', default=0.3)
+)
+
+IMAGE_RENDITIONS = {
+    'small': (320, 320),
+    'medium': (800, 800),
+}
+
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', default=2))
+
+IMAGE_RENDITIONS_EAGER = os.getenv('IMAGE_RENDITIONS_EAGER', default='False') == 'True'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -190,6 +307,10 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'django.server',
         },
+        'api': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+        },
         'mail_admins': {
             'level': 'ERROR',
             'filters': ['require_debug_false'],
@@ -206,5 +327,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'api': {
+            'handlers': ['api'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
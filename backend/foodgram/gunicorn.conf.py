@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+import sys
+
+# SERVER_MODE=asgi запускает foodgram.asgi под воркерами uvicorn,
+# SERVER_MODE=wsgi (по умолчанию) - foodgram.wsgi под синхронными воркерами.
+server_mode = os.getenv('SERVER_MODE', default='wsgi')
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1
+))
+
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS',
+    default=(
+        'uvicorn.workers.UvicornWorker' if server_mode == 'asgi' else 'sync'
+    )
+)
+
+threads = int(os.getenv('GUNICORN_THREADS', default=1))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000))
+
+max_requests_jitter = int(
+    os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+)
+
+
+def worker_exit(server, worker):
+    # Воркер перезапускается после max_requests запросов: перед выходом
+    # дожидаемся фото, поставленных им в очередь на уменьшение. Если воркер
+    # убит раньше (timeout, SIGKILL), копии создает generate_renditions.
+    renditions = sys.modules.get('recipes.renditions')
+    if renditions is not None:
+        renditions.executor.shutdown(wait=True)
@@ -9,7 +9,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
-        'favorite_count'
+        'favorites_count'
     )
     search_fields = (
         'author',
@@ -17,12 +17,10 @@ class RecipeAdmin(admin.ModelAdmin):
         'tags',
     )
     readonly_fields = (
-        'favorite_count',
+        'favorites_count',
+        'carts_count',
     )
 
-    def favorite_count(self, obj):
-        return obj.favorite_recipe.select_related('user').count()
-
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -0,0 +1,70 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Ingredient
+
+
+class IngredientIndex:
+    '''Индекс названий ингредиентов в памяти процесса.
+
+    Названия хранятся отсортированными, поиск по префиксу выполняется
+    бинарным поиском. Индекс строится при первом обращении и сбрасывается
+    при изменении ингредиентов в этом процессе или по истечении
+    INGREDIENT_INDEX_TTL, чтобы подхватить изменения из других процессов.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._generation = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self._generation += 1
+
+    def _get_data(self):
+        data = self._data
+        if data is not None and data[0] > time.monotonic():
+            return data
+        generation = self._generation
+        rows = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda row: (row['name'].casefold(), row['id'])
+        )
+        data = (
+            time.monotonic() + settings.INGREDIENT_INDEX_TTL,
+            [row['name'].casefold() for row in rows],
+            rows,
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._data = data
+        return data
+
+    def search(self, name, limit):
+        '''Сначала совпадения по началу названия, затем по подстроке'''
+        _, keys, rows = self._get_data()
+        name = name.casefold()
+        result = []
+        position = bisect.bisect_left(keys, name)
+        while (
+            position < len(keys)
+            and len(result) < limit
+            and keys[position].startswith(name)
+        ):
+            result.append(rows[position])
+            position += 1
+        if len(result) < limit:
+            for key, row in zip(keys, rows):
+                if name in key and not key.startswith(name):
+                    result.append(row)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
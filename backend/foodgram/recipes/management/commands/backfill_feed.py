@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from recipes.models import FeedEntry
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает число подписчиков авторов и заново собирает ленты '
+        'пользователей из рецептов авторов, на которых они подписаны.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='id пользователя, можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        User.objects.recalculate_followers_count()
+        FeedEntry.rebuild(users=options['users'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedEntry.objects.count()}'
+        ))
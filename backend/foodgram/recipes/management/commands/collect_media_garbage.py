@@ -0,0 +1,65 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipes.models import Recipe
+from recipes.storage import content_storage
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет фотографии рецептов и их уменьшенные копии, '
+        'на которые не ссылается ни один рецепт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только вывести файлы, которые будут удалены',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            help=(
+                'Не трогать файлы моложе указанного числа минут: '
+                'они могут принадлежать еще не сохраненному рецепту'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        for image, renditions in Recipe.objects.values_list(
+            'image', 'renditions'
+        ).iterator():
+            referenced.add(image)
+            for size, formats in renditions.items():
+                if size != 'source':
+                    referenced.update(formats.values())
+        upload_to = Recipe._meta.get_field('image').upload_to.rstrip('/')
+        if not content_storage.exists(upload_to):
+            self.stdout.write(self.style.SUCCESS('Удалено файлов: 0'))
+            return
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        deleted = 0
+        for name in walk(content_storage, upload_to):
+            if name in referenced:
+                continue
+            if content_storage.get_modified_time(name) > threshold:
+                continue
+            self.stdout.write(name)
+            if not options['dry_run']:
+                content_storage.delete(name)
+            deleted += 1
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} файлов: {deleted}'))
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.models import RecipeSimilarity
+from recipes.recommendations import compute_similarities, sparse
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает похожие рецепты по общим добавлениям в избранное и '
+        'общим ингредиентам и сохраняет top-K соседей каждого рецепта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=settings.RECOMMENDATIONS_TOP_K,
+        )
+        parser.add_argument(
+            '--ingredient-weight',
+            type=float,
+            default=settings.RECOMMENDATIONS_INGREDIENT_WEIGHT,
+            help='Вес сходства по ингредиентам от 0 до 1',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Число рецептов в одном блоке матричного умножения',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if sparse is None:
+            self.stdout.write(
+                'NumPy и SciPy не установлены, расчет без матриц'
+            )
+        RecipeSimilarity.replace_all(compute_similarities(
+            options['top_k'],
+            options['ingredient_weight'],
+            options['chunk_size'],
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            'Сохранено пар: {} за {:.1f} с'.format(
+                RecipeSimilarity.objects.count(),
+                time.perf_counter() - started,
+            )
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит уменьшенные копии фотографий рецептов, для которых '
+        'они еще не созданы или устарели.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии для всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('image', 'renditions')
+        processed = 0
+        for recipe in recipes.iterator():
+            if (
+                options['force']
+                or recipe.renditions.get('source') != recipe.image.name
+            ):
+                generate_renditions(recipe.pk)
+                processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано рецептов: {processed}')
+        )
@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import re
+import time
+from itertools import islice
+from pathlib import Path
+
+from api.v1.cache import invalidate_cache
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.models import Ingredient
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_json(file):
+    '''Построчно разбирает JSON-массив, не загружая файл целиком
+
+    Буфер не копируется на каждый элемент: разбор идет по смещению,
+    а прочитанная часть отбрасывается только при подгрузке нового куска.
+    '''
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE)
+    while buffer.isspace():
+        buffer = file.read(CHUNK_SIZE)
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив ингредиентов')
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON поврежден или обрезан')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item['name'], item['measurement_unit']
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
+
+
+def copy_value(value):
+    return (
+        value.replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из JSON или CSV файла. Повторная загрузка '
+        'пропускает уже существующие пары название/единица измерения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(Path(settings.BASE_DIR) / 'data' / 'ingredients.json'),
+            help='Путь к файлу .json или .csv',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .json и .csv')
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        load_batch = self.copy_batch if use_copy else self.insert_batch
+        started = time.perf_counter()
+        count_before = Ingredient.objects.count()
+        processed = 0
+        with open(path, encoding='utf8') as file:
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    load_batch(batch)
+                processed += len(batch)
+        created = Ingredient.objects.count() - count_before
+        if created:
+            invalidate_cache('ingredients')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Обработано строк: {}, добавлено: {}, {:.1f} с '
+            '({:.0f} строк/с)'.format(
+                processed, created, elapsed, processed / max(elapsed, 1e-9)
+            )
+        ))
+
+    @staticmethod
+    def insert_batch(batch):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in batch
+            ],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def copy_batch(batch):
+        table = Ingredient._meta.db_table
+        buffer = io.StringIO()
+        for name, measurement_unit in batch:
+            buffer.write(
+                f'{copy_value(name)}\t{copy_value(measurement_unit)}\n'
+            )
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS ingredients_import '
+                '(name varchar(200), measurement_unit varchar(150)) '
+                'ON COMMIT DELETE ROWS'
+            )
+            cursor.copy_expert(
+                'COPY ingredients_import (name, measurement_unit) FROM STDIN',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredients_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
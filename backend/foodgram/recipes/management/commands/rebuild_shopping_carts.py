@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает суммарное содержимое корзин пользователей '
+        'или проверяет его на расхождения с рецептами в корзинах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить сохраненные данные с пересчитанными',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='id пользователя, можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if not options['verify']:
+            ShoppingCartIngredient.rebuild(users=users)
+            self.stdout.write(self.style.SUCCESS('Корзины пересчитаны'))
+            return
+        expected = {
+            (user, ingredient): amount
+            for user, ingredient, amount
+            in ShoppingCartIngredient.calculate(users).iterator()
+        }
+        stored = ShoppingCartIngredient.objects.all()
+        if users is not None:
+            stored = stored.filter(user__in=users)
+        mismatches = 0
+        for user, ingredient, amount in stored.values_list(
+            'user', 'ingredient', 'amount'
+        ).iterator():
+            expected_amount = expected.pop((user, ingredient), 0)
+            if amount != expected_amount:
+                mismatches += 1
+                self.stdout.write(
+                    f'Пользователь {user}, ингредиент {ingredient}: '
+                    f'{amount} вместо {expected_amount}'
+                )
+        for (user, ingredient), amount in expected.items():
+            mismatches += 1
+            self.stdout.write(
+                f'Пользователь {user}, ингредиент {ingredient}: '
+                f'нет записи, ожидалось {amount}'
+            )
+        if mismatches:
+            raise CommandError(f'Найдено расхождений: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики избранного и корзин у рецептов с фактическими '
+        'записями и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать рецепты с расхождениями',
+        )
+
+    def handle(self, *args, **options):
+        drifted = Recipe.objects.annotate(
+            actual_favorites=Count('favorite_recipe', distinct=True),
+            actual_carts=Count('shopping_cart_recipe', distinct=True),
+        ).filter(
+            ~Q(favorites_count=F('actual_favorites'))
+            | ~Q(carts_count=F('actual_carts'))
+        ).values_list(
+            'id', 'favorites_count', 'actual_favorites',
+            'carts_count', 'actual_carts'
+        )
+        drifted_ids = []
+        for recipe_id, favorites, actual_favorites, carts, actual_carts in (
+            drifted.iterator()
+        ):
+            drifted_ids.append(recipe_id)
+            self.stdout.write(
+                f'Рецепт {recipe_id}: избранное {favorites} -> '
+                f'{actual_favorites}, корзины {carts} -> {actual_carts}'
+            )
+        if not options['dry_run'] and drifted_ids:
+            Recipe.objects.filter(id__in=drifted_ids).recalculate_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов с расхождениями: {len(drifted_ids)}'
+        ))
@@ -0,0 +1,65 @@
+# Generated by Django 3.2 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+    RecipeIngredientsM2M = Recipe.ingredients.through
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        first_id=models.Min('id'),
+        total=models.Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        keep = duplicate['first_id']
+        others = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(id=keep).values_list('id', flat=True))
+        RecipeIngredients.objects.filter(
+            ingredient__in=others
+        ).update(ingredient=keep)
+        RecipeIngredientsM2M.objects.filter(
+            ingredient__in=others,
+            recipe__in=RecipeIngredientsM2M.objects.filter(
+                ingredient=keep
+            ).values('recipe')
+        ).delete()
+        RecipeIngredientsM2M.objects.filter(
+            ingredient__in=others
+        ).update(ingredient=keep)
+        for row in ShoppingCartIngredient.objects.filter(
+            ingredient__in=others
+        ):
+            kept, _ = ShoppingCartIngredient.objects.get_or_create(
+                user_id=row.user_id,
+                ingredient_id=keep
+            )
+            kept.amount += row.amount
+            kept.save()
+            row.delete()
+        Ingredient.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+    # Слияние дублей и уникальное ограничение разнесены по разным
+    # миграциям: удаление строк Ingredient оставляет отложенные проверки
+    # внешних ключей, и PostgreSQL не дает выполнить ALTER TABLE той же
+    # таблицы в одной транзакции с ними.
+
+    dependencies = [
+        ('recipes', '0010_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
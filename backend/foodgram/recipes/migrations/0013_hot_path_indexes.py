@@ -0,0 +1,110 @@
+# Generated by Django 3.2 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+# Верхняя граница PositiveSmallIntegerField во всех поддерживаемых СУБД
+MAX_AMOUNT = 32767
+
+
+def delete_duplicates(model, fields):
+    duplicates = model.objects.values(*fields).annotate(
+        first_id=models.Min('id'),
+        total=models.Count('id')
+    ).filter(total__gt=1)
+    deleted = 0
+    for duplicate in duplicates:
+        first_id = duplicate.pop('first_id')
+        duplicate.pop('total')
+        deleted += model.objects.filter(
+            **duplicate
+        ).exclude(id=first_id).delete()[0]
+    return deleted
+
+
+def remove_duplicates(apps, schema_editor):
+    Favorite = apps.get_model('recipes', 'Favorite')
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+    delete_duplicates(Favorite, ['user', 'recipe'])
+    duplicates = RecipeIngredients.objects.values(
+        'recipe', 'ingredient'
+    ).annotate(
+        first_id=models.Min('id'),
+        total=models.Count('id'),
+        total_amount=models.Sum('amount')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        RecipeIngredients.objects.filter(
+            id=duplicate['first_id']
+        ).update(amount=min(duplicate['total_amount'], MAX_AMOUNT))
+    delete_duplicates(RecipeIngredients, ['recipe', 'ingredient'])
+    if delete_duplicates(ShoppingCart, ['user', 'recipe']):
+        ShoppingCartIngredient.objects.all().delete()
+        totals = RecipeIngredients.objects.filter(
+            recipe__shopping_cart_recipe__isnull=False
+        ).values(
+            'recipe__shopping_cart_recipe__user', 'ingredient'
+        ).annotate(
+            total_amount=models.Sum('amount')
+        ).values_list(
+            'recipe__shopping_cart_recipe__user',
+            'ingredient',
+            'total_amount'
+        ).order_by()
+        ShoppingCartIngredient.objects.bulk_create(
+            (
+                ShoppingCartIngredient(
+                    user_id=user, ingredient_id=ingredient, amount=amount
+                )
+                for user, ingredient, amount in totals.iterator()
+            ),
+            batch_size=1000
+        )
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_like '
+            'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+        )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS recipes_ingredient_name_like'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredients',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-18 05:10
+
+import datetime
+
+from django.db import migrations, models
+
+
+def spread_pub_dates(apps, schema_editor):
+    '''Разводит одинаковые даты публикации по порядку id
+
+    0014 проставила всем существующим рецептам одну и ту же дату, а
+    CursorPagination строит курсор только по первому полю сортировки и
+    при совпадениях откатывается к OFFSET. Внутри группы рецептов с общей
+    датой более ранний id получает более раннюю дату с шагом в 1 мкс.
+    '''
+    Recipe = apps.get_model('recipes', 'Recipe')
+    duplicates = Recipe.objects.values('pub_date').annotate(
+        total=models.Count('id')
+    ).filter(total__gt=1).values_list('pub_date', 'total').order_by()
+    step = datetime.timedelta(microseconds=1)
+    for pub_date, total in list(duplicates):
+        recipes = list(
+            Recipe.objects.filter(pub_date=pub_date).only('id').order_by('id')
+        )
+        for index, recipe in enumerate(recipes):
+            recipe.pub_date = pub_date - step * (total - 1 - index)
+        Recipe.objects.bulk_update(recipes, ['pub_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_recipesimilarity'),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_pub_dates, migrations.RunPython.noop),
+    ]
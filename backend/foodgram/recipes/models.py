@@ -1,7 +1,15 @@
+import heapq
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
-from django.db.models import Sum
-from users.models import User
+from django.db import models, transaction
+from django.db.models import (Count, Exists, F, OuterRef, Prefetch, Q,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, Greatest
+from users.models import Follow, User
+
+from .storage import content_storage
 
 
 class Ingredient(models.Model):
@@ -18,6 +26,14 @@ class Ingredient(models.Model):
         help_text='Единица измерения',
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
+
     def __str__(self):
         return self.name
 
@@ -53,6 +69,89 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_user_data(self, user):
+        '''Аннотирует рецепты флагами пользователя и подгружает связи'''
+        if user.is_authenticated:
+            queryset = self.annotate(
+                is_favorited=Exists(Favorite.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                )),
+            )
+        else:
+            queryset = self.annotate(
+                is_favorited=Value(False, models.BooleanField()),
+                is_in_shopping_cart=Value(False, models.BooleanField()),
+            )
+        return queryset.defer('search_vector').prefetch_related(
+            Prefetch(
+                'author',
+                queryset=User.objects.with_is_subscribed(user)
+            ),
+            'tags',
+            Prefetch(
+                'recipeingredients_set',
+                queryset=RecipeIngredients.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    def feed(self, user):
+        '''Рецепты авторов, на которых подписан пользователь.
+
+        Рецепты авторов с небольшим числом подписчиков берутся из ленты
+        пользователя, рецепты остальных авторов - напрямую по подпискам.
+        '''
+        return self.filter(
+            Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe'))
+            | Q(author__in=Follow.objects.filter(
+                user=user,
+                author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+            ).values('author'))
+        )
+
+    def similar_to(self, recipe_id):
+        '''Похожие рецепты в порядке убывания сходства'''
+        return self.filter(
+            similar_for__recipe=recipe_id
+        ).order_by('-similar_for__score')
+
+    def recommended_for(self, user):
+        '''Рецепты, похожие на избранные пользователем'''
+        return self.filter(
+            similar_for__recipe__favorite_recipe__user=user
+        ).exclude(
+            favorite_recipe__user=user
+        ).annotate(
+            score=Sum('similar_for__score')
+        ).order_by('-score', '-id')
+
+    def recalculate_counters(self):
+        '''Пересчитывает счетчики избранного и корзин по исходным таблицам'''
+        return self.update(
+            favorites_count=Coalesce(Subquery(
+                Favorite.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    total=Count('id')
+                ).values('total')
+            ), 0),
+            carts_count=Coalesce(Subquery(
+                ShoppingCart.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    total=Count('id')
+                ).values('total')
+            ), 0),
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -68,6 +167,7 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=content_storage,
         blank=False,
         verbose_name='Фото блюда',
         help_text='Фотография блюда',
@@ -95,6 +195,59 @@ class Recipe(models.Model):
         verbose_name='Время приготовления, мин.',
         help_text='Время приготовления, мин.',
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное',
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в корзину',
+    )
+    pub_date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата публикации',
+    )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии фото',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count'],
+                name='recipe_favorites_count_idx'
+            ),
+        ]
+
+    @classmethod
+    def change_counter(cls, recipe_id, field, difference):
+        cls.change_counters([recipe_id], field, difference)
+
+    @classmethod
+    def change_counters(cls, recipe_ids, field, difference):
+        cls.objects.filter(pk__in=recipe_ids).update(
+            **{field: Greatest(F(field) + difference, 0)}
+        )
 
     def __str__(self):
         return self.name
@@ -117,6 +270,14 @@ class Favorite(models.Model):
 
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_favorite'
+            )
+        ]
+
     def __str__(self):
         return 'Избранное'
 
@@ -138,6 +299,14 @@ class ShoppingCart(models.Model):
 
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_shopping_cart'
+            )
+        ]
+
     def __str__(self):
         return 'Корзина'
 
@@ -155,21 +324,339 @@ class RecipeIngredients(models.Model):
         verbose_name='Количество'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
+
+    @classmethod
+    def get_amounts(cls, recipe):
+        amounts = {}
+        for ingredient, amount in cls.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient', 'amount'):
+            amounts[ingredient] = amounts.get(ingredient, 0) + amount
+        return amounts
+
+    @classmethod
+    def get_total_amounts(cls, recipes):
+        '''Суммарные количества ингредиентов нескольких рецептов'''
+        return dict(
+            cls.objects.filter(
+                recipe__in=recipes
+            ).values('ingredient').annotate(
+                total=Sum('amount')
+            ).values_list('ingredient', 'total').order_by()
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} {self.recipe}'
+
+
+class ShoppingCartIngredient(models.Model):
+    '''Суммарное количество ингредиента в корзине пользователя'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_ingredient'
+            )
+        ]
+
     @classmethod
     def get_shopping_list(cls, user):
-        ingredients = cls.objects.filter(
-            recipe__shopping_cart_recipe__user=user
-        ).values(
-            'ingredient'
+        return cls.objects.filter(
+            user=user
+        ).values_list(
+            'ingredient__name', 'amount', 'ingredient__measurement_unit'
+        ).order_by(
+            'ingredient__name'
+        )
+
+    @classmethod
+    def change_amounts(cls, users, amounts, sign=1):
+        '''Прибавляет (или вычитает) количества ингредиентов в корзинах'''
+        users = list(users)
+        if not users or not amounts:
+            return
+        if sign > 0:
+            cls.objects.bulk_create(
+                [
+                    cls(user_id=user, ingredient_id=ingredient)
+                    for user in users
+                    for ingredient in amounts
+                ],
+                ignore_conflicts=True
+            )
+        ingredients_by_amount = {}
+        for ingredient, amount in amounts.items():
+            ingredients_by_amount.setdefault(
+                amount * sign, []
+            ).append(ingredient)
+        for amount, ingredients in ingredients_by_amount.items():
+            cls.objects.filter(
+                user__in=users,
+                ingredient__in=ingredients
+            ).update(amount=Greatest(F('amount') + amount, 0))
+        cls.objects.filter(
+            user__in=users,
+            ingredient__in=amounts,
+            amount=0
+        ).delete()
+
+    @staticmethod
+    def calculate(users=None):
+        '''Считает содержимое корзин по рецептам в них'''
+        queryset = RecipeIngredients.objects.filter(
+            recipe__shopping_cart_recipe__isnull=False
+        )
+        if users is not None:
+            queryset = queryset.filter(
+                recipe__shopping_cart_recipe__user__in=users
+            )
+        return queryset.values(
+            'recipe__shopping_cart_recipe__user', 'ingredient'
         ).annotate(
             total_amount=Sum('amount')
         ).values_list(
-            'ingredient__name', 'total_amount', 'ingredient__measurement_unit'
+            'recipe__shopping_cart_recipe__user',
+            'ingredient',
+            'total_amount'
+        ).order_by()
+
+    @classmethod
+    def rebuild(cls, users=None):
+        with transaction.atomic():
+            stale = cls.objects.all()
+            if users is not None:
+                stale = stale.filter(user__in=users)
+            stale.delete()
+            cls.objects.bulk_create(
+                (
+                    cls(user_id=user, ingredient_id=ingredient, amount=amount)
+                    for user, ingredient, amount in cls.calculate(
+                        users
+                    ).iterator()
+                ),
+                batch_size=1000
+            )
+
+    def __str__(self):
+        return f'{self.ingredient} {self.amount}'
+
+
+class RecipeSimilarity(models.Model):
+    '''Похожий рецепт из top-K соседей, посчитанных командой
+    compute_recommendations'''
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_for',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_recipe_similarity'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='recipe_similarity_score_idx'
+            ),
+        ]
+
+    @classmethod
+    def replace_all(cls, similarities):
+        '''Заменяет сохраненных соседей на (recipe, similar, score)'''
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                (
+                    cls(recipe_id=recipe, similar_id=similar, score=score)
+                    for recipe, similar, score in similarities
+                ),
+                batch_size=1000
+            )
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar} {self.score:.3f}'
+
+
+class FeedEntry(models.Model):
+    '''Рецепт в ленте подписчика, добавленный при публикации'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_user_pub_date_idx'
+            ),
+        ]
+
+    @staticmethod
+    def is_fanned_out(author_id):
+        '''Рецепты автора раскладываются по лентам при публикации,
+        если у него не больше FEED_FANOUT_MAX_FOLLOWERS подписчиков'''
+        return User.objects.filter(
+            pk=author_id,
+            followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).exists()
+
+    @classmethod
+    def add(cls, users, recipes):
+        '''Добавляет в ленты рецепты, заданные парами (id, pub_date)'''
+        cls.objects.bulk_create(
+            (
+                cls(user_id=user, recipe_id=recipe, pub_date=pub_date)
+                for user in users
+                for recipe, pub_date in recipes
+            ),
+            batch_size=1000,
+            ignore_conflicts=True
         )
-        shopping_list = ''
-        for ingredient in ingredients:
-            shopping_list += '{} - {} {}. \n'.format(*ingredient)
-        return shopping_list
+
+    @classmethod
+    def fan_out(cls, recipe):
+        if cls.is_fanned_out(recipe.author_id):
+            cls.add(
+                Follow.objects.filter(
+                    author=recipe.author_id
+                ).values_list('user', flat=True),
+                [(recipe.pk, recipe.pub_date)]
+            )
+
+    @classmethod
+    def backfill(cls, users, author_id):
+        '''Добавляет в ленты последние FEED_BACKFILL_LIMIT рецептов автора'''
+        if cls.is_fanned_out(author_id):
+            cls.add(users, list(
+                Recipe.objects.filter(
+                    author=author_id
+                ).values_list(
+                    'pk', 'pub_date'
+                )[:settings.FEED_BACKFILL_LIMIT]
+            ))
+
+    @staticmethod
+    def after(position, id_field, reverse=False):
+        '''Условие keyset-пагинации по (pub_date, id) после позиции'''
+        if position is None:
+            return Q()
+        pub_date, pk = position
+        lookup, bound = ('gt', 'gte') if reverse else ('lt', 'lte')
+        # Избыточное условие на pub_date ограничивает диапазон индекса.
+        return Q(**{f'pub_date__{bound}': pub_date}) & (
+            Q(**{f'pub_date__{lookup}': pub_date})
+            | Q(**{'pub_date': pub_date, f'{id_field}__{lookup}': pk})
+        )
+
+    @classmethod
+    def timeline(cls, user, limit, position=None, reverse=False):
+        '''Ключи (pub_date, id рецепта) ленты пользователя после позиции.
+
+        Лента читается по индексу (user, -pub_date, -recipe), рецепты
+        авторов, которые не раскладываются по лентам, - по индексу
+        (author, -pub_date, -id). Оба списка уже упорядочены, поэтому
+        сливаются без сортировки. При reverse ключи идут в обратном
+        порядке, от старых к новым.
+        '''
+        sign = '' if reverse else '-'
+        entries = cls.objects.filter(
+            cls.after(position, 'recipe_id', reverse), user=user
+        ).order_by(
+            f'{sign}pub_date', f'{sign}recipe_id'
+        ).values_list('pub_date', 'recipe_id')[:limit]
+        recipes = Recipe.objects.filter(
+            cls.after(position, 'id', reverse),
+            author__in=Follow.objects.filter(
+                user=user,
+                author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+            ).values('author')
+        ).order_by(
+            f'{sign}pub_date', f'{sign}id'
+        ).values_list('pub_date', 'id')[:limit]
+        keys = []
+        for key in heapq.merge(entries, recipes, reverse=not reverse):
+            # Рецепт есть в обоих списках, если автор набрал подписчиков
+            # уже после публикации.
+            if keys and keys[-1] == key:
+                continue
+            keys.append(key)
+            if len(keys) == limit:
+                break
+        return keys
+
+    @classmethod
+    def remove(cls, user_id, author_id):
+        cls.objects.filter(user=user_id, recipe__author=author_id).delete()
+
+    @classmethod
+    def rebuild(cls, users=None):
+        with transaction.atomic():
+            stale = cls.objects.all()
+            follows = Follow.objects.all()
+            if users is not None:
+                stale = stale.filter(user__in=users)
+                follows = follows.filter(user__in=users)
+            stale.delete()
+            followers = {}
+            for user, author in follows.values_list(
+                'user', 'author'
+            ).order_by().iterator():
+                followers.setdefault(author, []).append(user)
+            for author, author_followers in followers.items():
+                cls.backfill(author_followers, author)
 
     def __str__(self):
-        return f'{self.ingredient} {self.recipe}'
+        return f'{self.user} {self.recipe}'
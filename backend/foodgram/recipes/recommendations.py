@@ -0,0 +1,139 @@
+import heapq
+import math
+from collections import defaultdict
+
+from .models import Favorite, Recipe, RecipeIngredients
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+def get_recipe_features():
+    '''id рецептов и пары (рецепт, признак): пользователи, добавившие
+    рецепт в избранное, и ингредиенты рецепта.
+
+    Пары читаются позже списка рецептов, поэтому пары рецептов,
+    созданных за это время, пропускаются.
+    '''
+    recipe_ids = list(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    known = set(recipe_ids)
+    favorites = Favorite.objects.values_list('recipe', 'user').order_by()
+    ingredients = RecipeIngredients.objects.values_list(
+        'recipe', 'ingredient'
+    ).order_by()
+    return recipe_ids, (
+        pair for pair in favorites.iterator() if pair[0] in known
+    ), (
+        pair for pair in ingredients.iterator() if pair[0] in known
+    )
+
+
+def compute_similarities(top_k, ingredient_weight, chunk_size=500):
+    '''Для каждого рецепта возвращает до top_k соседей (recipe, similar,
+    score). Сходство - взвешенная сумма косинусных мер по общим
+    добавлениям в избранное и по общим ингредиентам.
+
+    С NumPy и SciPy считается произведениями разреженных матриц блоками
+    по chunk_size рецептов, без них - по инвертированным спискам.
+    '''
+    recipe_ids, favorites, ingredients = get_recipe_features()
+    weights = (1 - ingredient_weight, ingredient_weight)
+    if sparse is None:
+        return compute_similarities_python(
+            recipe_ids, (favorites, ingredients), weights, top_k
+        )
+    return compute_similarities_sparse(
+        recipe_ids, (favorites, ingredients), weights, top_k, chunk_size
+    )
+
+
+def build_normalized_matrix(index, pairs):
+    '''Матрица рецепты x признаки с единичной нормой строк'''
+    rows = []
+    columns = []
+    column_index = {}
+    for recipe, feature in pairs:
+        rows.append(index[recipe])
+        columns.append(column_index.setdefault(feature, len(column_index)))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(index), max(len(column_index), 1))
+    )
+    norms = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def compute_similarities_sparse(recipe_ids, features, weights, top_k,
+                                chunk_size):
+    index = {recipe: position for position, recipe in enumerate(recipe_ids)}
+    matrices = [
+        (weight, build_normalized_matrix(index, pairs))
+        for weight, pairs in zip(weights, features)
+        if weight
+    ]
+    for start in range(0, len(recipe_ids), chunk_size):
+        end = min(start + chunk_size, len(recipe_ids))
+        scores = sum(
+            weight * matrix[start:end].dot(matrix.T)
+            for weight, matrix in matrices
+        ).tocsr()
+        for row in range(end - start):
+            begin, finish = scores.indptr[row], scores.indptr[row + 1]
+            columns = scores.indices[begin:finish]
+            values = scores.data[begin:finish]
+            keep = (columns != start + row) & (values > 0)
+            columns, values = columns[keep], values[keep]
+            if len(values) > top_k:
+                best = np.argpartition(-values, top_k)[:top_k]
+                columns, values = columns[best], values[best]
+            recipe = recipe_ids[start + row]
+            for column, value in zip(columns.tolist(), values.tolist()):
+                yield recipe, recipe_ids[column], value
+
+
+def build_inverted_index(pairs):
+    '''Признаки каждого рецепта и рецепты каждого признака'''
+    recipe_features = defaultdict(set)
+    for recipe, feature in pairs:
+        recipe_features[recipe].add(feature)
+    recipes_by_feature = defaultdict(list)
+    for recipe, values in recipe_features.items():
+        for feature in values:
+            recipes_by_feature[feature].append(recipe)
+    return recipe_features, recipes_by_feature
+
+
+def score_recipe(recipe, vectors):
+    '''Сходство рецепта со всеми рецептами, у которых есть общие признаки'''
+    scores = defaultdict(float)
+    for weight, recipe_features, recipes_by_feature in vectors:
+        if recipe not in recipe_features:
+            continue
+        norm = weight / math.sqrt(len(recipe_features[recipe]))
+        for feature in recipe_features[recipe]:
+            for other in recipes_by_feature[feature]:
+                scores[other] += norm / math.sqrt(
+                    len(recipe_features[other])
+                )
+    scores.pop(recipe, None)
+    return scores
+
+
+def compute_similarities_python(recipe_ids, features, weights, top_k):
+    vectors = [
+        (weight, *build_inverted_index(pairs))
+        for weight, pairs in zip(weights, features)
+        if weight
+    ]
+    for recipe in recipe_ids:
+        for other, score in heapq.nlargest(
+            top_k, score_recipe(recipe, vectors).items(),
+            key=lambda item: item[1]
+        ):
+            yield recipe, other, score
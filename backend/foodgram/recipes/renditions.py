@@ -0,0 +1,88 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True},
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions',
+)
+
+
+def rendition_name(digest, size, extension):
+    return f'recipes/renditions/{digest[:2]}/{digest}_{size}.{extension}'
+
+
+def create_renditions(image_file):
+    '''Сохраняет уменьшенные копии изображения и возвращает их имена.
+
+    Имена файлов строятся из хэша исходного изображения, поэтому
+    повторная обработка того же файла ничего не перезаписывает.
+    '''
+    content = image_file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    storage = default_storage
+    renditions = {}
+    with Image.open(io.BytesIO(content)) as source:
+        source = ImageOps.exif_transpose(source).convert('RGB')
+        for size, max_size in settings.IMAGE_RENDITIONS.items():
+            image = source.copy()
+            image.thumbnail(max_size, Image.LANCZOS)
+            renditions[size] = {}
+            for extension, options in FORMATS.items():
+                name = rendition_name(digest, size, extension)
+                if not storage.exists(name):
+                    buffer = io.BytesIO()
+                    image.save(buffer, **options)
+                    name = storage.save(name, ContentFile(buffer.getvalue()))
+                renditions[size][extension] = name
+    return renditions
+
+
+def generate_renditions(recipe_id):
+    recipe = Recipe.objects.only('image').filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    with recipe.image.open('rb') as image_file:
+        renditions = create_renditions(image_file)
+    renditions['source'] = recipe.image.name
+    Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(renditions=renditions)
+
+
+def run_in_worker(recipe_id):
+    close_old_connections()
+    try:
+        generate_renditions(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось подготовить изображения рецепта %s', recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe_id):
+    '''Ставит обработку изображения в очередь после фиксации транзакции'''
+    if settings.IMAGE_RENDITIONS_EAGER:
+        transaction.on_commit(lambda: generate_renditions(recipe_id))
+    else:
+        transaction.on_commit(
+            lambda: executor.submit(run_in_worker, recipe_id)
+        )
@@ -0,0 +1,135 @@
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+
+from .models import Recipe
+
+WEIGHTS = {
+    'name': 1.0,
+    'text': 0.4,
+}
+
+
+def get_search_vector():
+    return (
+        SearchVector('name', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=settings.SEARCH_CONFIG)
+    )
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.casefold())
+
+
+class RecipeIndex:
+    '''Инвертированный индекс рецептов в памяти процесса.
+
+    Используется вместо полнотекстового поиска PostgreSQL на других базах
+    данных. Каждому слову сопоставлены рецепты и вес совпадения, найденными
+    считаются рецепты, содержащие все слова запроса.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._generation = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self._generation += 1
+
+    def _get_data(self):
+        data = self._data
+        if data is not None and data[0] > time.monotonic():
+            return data
+        generation = self._generation
+        postings = defaultdict(dict)
+        for recipe in Recipe.objects.values('id', *WEIGHTS).iterator():
+            for field, weight in WEIGHTS.items():
+                for token in tokenize(recipe[field]):
+                    scores = postings[token]
+                    scores[recipe['id']] = (
+                        scores.get(recipe['id'], 0) + weight
+                    )
+        data = (time.monotonic() + settings.RECIPE_INDEX_TTL, postings)
+        with self._lock:
+            if generation == self._generation:
+                self._data = data
+        return data
+
+    def search(self, query):
+        '''Возвращает словарь {id рецепта: релевантность}'''
+        tokens = set(tokenize(query))
+        if not tokens:
+            return {}
+        _, postings = self._get_data()
+        ranks = None
+        for token in tokens:
+            scores = postings.get(token, {})
+            if ranks is None:
+                ranks = dict(scores)
+            else:
+                ranks = {
+                    recipe_id: rank + scores[recipe_id]
+                    for recipe_id, rank in ranks.items()
+                    if recipe_id in scores
+                }
+            if not ranks:
+                return {}
+        return ranks
+
+
+recipe_index = RecipeIndex()
+
+
+def search_recipes(queryset, query, top=None):
+    '''Фильтрует рецепты по запросу и добавляет аннотацию rank.
+
+    Без PostgreSQL ранг из индекса в памяти подставляется выражением CASE
+    с одной веткой на каждое значение ранга. Если задан top, ранг получают
+    только рецепты, которые могут попасть в первые top результатов:
+    остальные найденные рецепты идут после них с рангом 0.
+    '''
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, search_type='websearch', config=settings.SEARCH_CONFIG
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        )
+    ranks = recipe_index.search(query)
+    ranked = ranks
+    if top is not None and len(ranks) > top:
+        cutoff = min(heapq.nlargest(top, ranks.values()), default=None)
+        ranked = {
+            pk: rank for pk, rank in ranks.items()
+            if cutoff is not None and rank >= cutoff
+        }
+    ids_by_rank = defaultdict(list)
+    for pk, rank in ranked.items():
+        ids_by_rank[rank].append(pk)
+    return queryset.filter(pk__in=ranks).annotate(rank=Case(
+        *[
+            When(pk__in=ids, then=Value(rank))
+            for rank, ids in ids_by_rank.items()
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    ))
+
+
+def update_search_vectors(queryset):
+    '''Обновляет поисковые данные рецептов после изменения name и text'''
+    if connection.vendor == 'postgresql':
+        queryset.update(search_vector=get_search_vector())
+    else:
+        recipe_index.invalidate()
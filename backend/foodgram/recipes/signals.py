@@ -0,0 +1,158 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from users.models import Follow, User
+
+from .ingredient_index import ingredient_index
+from .models import (Favorite, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredients, ShoppingCart, ShoppingCartIngredient)
+from .renditions import schedule_renditions
+from .search import recipe_index, update_search_vectors
+
+recipe_ingredients_changed = Signal()
+
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'carts_count',
+}
+
+_bulk_change = threading.local()
+
+
+@contextmanager
+def bulk_change():
+    '''Отключает пересчет счетчиков и корзины в сигналах избранного и
+    корзины: пакетная операция обновляет их сама одним запросом.
+    Вложенные вызовы считаются, сигналы включаются после внешнего.'''
+    _bulk_change.depth = getattr(_bulk_change, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _bulk_change.depth -= 1
+
+
+def in_bulk_change():
+    return getattr(_bulk_change, 'depth', 0) > 0
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_cart_ingredients(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.change_amounts(
+            [instance.user_id],
+            RecipeIngredients.get_amounts(instance.recipe_id)
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_cart_ingredients(sender, instance, **kwargs):
+    if in_bulk_change():
+        return
+    ShoppingCartIngredient.change_amounts(
+        [instance.user_id],
+        RecipeIngredients.get_amounts(instance.recipe_id),
+        sign=-1
+    )
+
+
+@receiver(recipe_ingredients_changed)
+def update_cart_ingredients(sender, recipe, old_amounts, new_amounts,
+                            **kwargs):
+    added = {}
+    removed = {}
+    for ingredient in old_amounts.keys() | new_amounts.keys():
+        difference = (
+            new_amounts.get(ingredient, 0) - old_amounts.get(ingredient, 0)
+        )
+        if difference > 0:
+            added[ingredient] = difference
+        elif difference < 0:
+            removed[ingredient] = -difference
+    users = list(ShoppingCart.objects.filter(
+        recipe=recipe
+    ).values_list('user', flat=True))
+    ShoppingCartIngredient.change_amounts(users, added)
+    ShoppingCartIngredient.change_amounts(users, removed, sign=-1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increase_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        Recipe.change_counter(instance.recipe_id, COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrease_recipe_counter(sender, instance, **kwargs):
+    if in_bulk_change():
+        return
+    Recipe.change_counter(instance.recipe_id, COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_renditions(sender, instance, **kwargs):
+    if instance.image and (
+        instance.renditions.get('source') != instance.image.name
+    ):
+        schedule_renditions(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_index(sender, **kwargs):
+    recipe_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        FeedEntry.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_feed(sender, instance, created, **kwargs):
+    if created:
+        User.change_followers_count(instance.author_id, 1)
+        FeedEntry.backfill([instance.user_id], instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_feed(sender, instance, **kwargs):
+    User.change_followers_count(instance.author_id, -1)
+    FeedEntry.remove(instance.user_id, instance.author_id)
+    followers_count = User.objects.filter(
+        pk=instance.author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count == settings.FEED_FANOUT_MAX_FOLLOWERS:
+        # Автор снова раскладывает рецепты по лентам: добавляем подписчикам
+        # рецепты, опубликованные, пока лента собиралась при чтении. Это
+        # до FEED_FANOUT_MAX_FOLLOWERS * FEED_BACKFILL_LIMIT строк, поэтому
+        # не в транзакции отписки, а после ее фиксации.
+        transaction.on_commit(
+            lambda: backfill_followers(instance.author_id)
+        )
+
+
+def backfill_followers(author_id):
+    FeedEntry.backfill(
+        Follow.objects.filter(
+            author=author_id
+        ).values_list('user', flat=True),
+        author_id
+    )
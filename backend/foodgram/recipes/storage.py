@@ -0,0 +1,65 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''Хранилище, в котором имя файла определяется его содержимым.
+
+    Одинаковые файлы сохраняются на диск один раз: при повторной
+    загрузке возвращается имя уже существующего файла, а время его
+    изменения обновляется, чтобы collect_media_garbage не удалил файл,
+    пока рецепт с ним еще не сохранен. Новый файл пишется во временный
+    и появляется под своим именем атомарно, уже целиком.
+    '''
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        path = self.path(name)
+        try:
+            os.utime(path)
+            return name
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                # Тот же файл одновременно сохранил другой процесс
+                os.utime(path)
+        finally:
+            os.unlink(temporary)
+        return name
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,88 @@
+import pytest
+from api.v1.authentication import token_cache
+from django.core.cache import cache
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredients, Tag
+from recipes.search import recipe_index
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    '''Кэши процесса не откатываются вместе с тестовой транзакцией'''
+    cache.clear()
+    token_cache.clear()
+    recipe_index.invalidate()
+    ingredient_index.invalidate()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username='cook',
+        email='cook@example.com',
+        password='cook-password',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(
+        username='author',
+        email='author@example.com',
+        password='author-password',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=f'Тег {index}', slug=f'tag-{index}')
+        for index in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {index}', measurement_unit='г'
+        )
+        for index in range(10)
+    ]
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    def make_recipes(count, **fields):
+        recipes = []
+        for index in range(count):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=fields.get('name', f'Рецепт {index}'),
+                text=fields.get('text', 'Описание рецепта'),
+                image='recipes/test.png',
+                cooking_time=10,
+            )
+            recipe.tags.set(tags[:2])
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=recipe, ingredient=ingredient, amount=index + 1
+                )
+                for ingredient in ingredients[:3]
+            )
+            recipes.append(recipe)
+        return recipes
+    return make_recipes
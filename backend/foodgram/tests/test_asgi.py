@@ -0,0 +1,67 @@
+import asyncio
+import importlib
+import time
+
+import pytest
+from api.v1 import urls as api_urls
+from api.v1.views import TagViewSet
+from asgiref.testing import ApplicationCommunicator
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import clear_url_caches
+from foodgram import urls as root_urls
+from rest_framework.response import Response
+
+DELAY = 0.5
+REQUESTS = 4
+
+
+def reload_urls(settings, async_api):
+    '''Маршруты API строятся при импорте, а вложенный URLResolver кэширует
+    свой список, поэтому перезагружается и корневой URLconf'''
+    settings.ASYNC_API = async_api
+    for module in (api_urls, root_urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_api(settings):
+    reload_urls(settings, True)
+    yield
+    reload_urls(settings, False)
+
+
+async def get(application, path):
+    communicator = ApplicationCommunicator(application, {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+    })
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(timeout=10)
+    await communicator.receive_output(timeout=10)
+    return start['status']
+
+
+def test_async_api_handles_requests_concurrently(async_api, monkeypatch):
+    '''Вся цепочка middleware должна оставаться асинхронной, иначе Django
+    выполняет запросы по одному в общем синхронном потоке'''
+    def slow_list(self, request, *args, **kwargs):
+        time.sleep(DELAY)
+        return Response([])
+
+    monkeypatch.setattr(TagViewSet, 'list', slow_list)
+    application = ASGIHandler()
+
+    async def run():
+        return await asyncio.gather(
+            *(get(application, '/api/tags/') for _ in range(REQUESTS))
+        )
+
+    started = time.perf_counter()
+    statuses = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    assert statuses == [200] * REQUESTS
+    assert elapsed < DELAY * 2
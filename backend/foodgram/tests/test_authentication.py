@@ -0,0 +1,56 @@
+import pytest
+from api.v1.authentication import token_cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/users/me/'
+
+
+@pytest.fixture
+def token_client(user):
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client, token
+
+
+def test_revoked_token_rejected_by_other_processes(
+    token_client, monkeypatch, django_capture_on_commit_callbacks
+):
+    client, token = token_client
+    assert client.get(URL).status_code == 200
+    # Токен закэширован в другом процессе: локальный сброс до него
+    # не дойдет, остается только метка отзыва в общем кэше.
+    monkeypatch.setattr(token_cache, 'invalidate', lambda key: None)
+    monkeypatch.setattr(token_cache, 'invalidate_user', lambda user_id: None)
+    with django_capture_on_commit_callbacks(execute=True):
+        token.delete()
+    assert client.get(URL).status_code == 401
+
+
+def test_token_revoked_during_lookup_is_not_cached(
+    token_client, monkeypatch, django_capture_on_commit_callbacks
+):
+    '''Выход в другом процессе между чтением токена из базы и записью
+    в кэш не должен оставить токен действующим'''
+    client, token = token_client
+    lookup = TokenAuthentication.authenticate_credentials
+
+    def lookup_then_logout(self, key):
+        try:
+            return lookup(self, key)
+        finally:
+            with django_capture_on_commit_callbacks(execute=True):
+                Token.objects.filter(key=key).delete()
+
+    monkeypatch.setattr(
+        TokenAuthentication, 'authenticate_credentials', lookup_then_logout
+    )
+    assert client.get(URL).status_code == 200
+    monkeypatch.setattr(
+        TokenAuthentication, 'authenticate_credentials', lookup
+    )
+    assert client.get(URL).status_code == 401
@@ -0,0 +1,53 @@
+import pytest
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def test_etag_and_not_modified(client, tags):
+    response = client.get('/api/tags/')
+    assert response.status_code == 200
+    assert 'Accept' in response['Vary']
+    etag = response['ETag']
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+def test_etag_depends_on_accept(client, tags):
+    json_response = client.get('/api/tags/', HTTP_ACCEPT='application/json')
+    html_response = client.get('/api/tags/', HTTP_ACCEPT='text/html')
+    assert html_response['Content-Type'].startswith('text/html')
+    assert json_response['ETag'] != html_response['ETag']
+    response = client.get(
+        '/api/tags/',
+        HTTP_ACCEPT='text/html',
+        HTTP_IF_NONE_MATCH=json_response['ETag'],
+    )
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/html')
+
+
+@pytest.mark.parametrize('url, objects', (
+    ('/api/tags/', 'tags'),
+    ('/api/ingredients/', 'ingredients'),
+))
+def test_cache_invalidated_on_save_and_delete(client, request, url,
+                                              objects):
+    instance = request.getfixturevalue(objects)[0]
+    etag = client.get(url)['ETag']
+    instance.name = 'Новое название'
+    instance.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'Новое название' in [item['name'] for item in response.json()]
+    etag = response['ETag']
+    instance.delete()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'Новое название' not in [item['name'] for item in response.json()]
@@ -0,0 +1,126 @@
+import pytest
+from django.utils import timezone
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, User
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/feed/'
+
+
+@pytest.fixture
+def feed_recipes(user, author, make_recipes):
+    Follow.objects.create(user=user, author=author)
+    return make_recipes(3, name='Борщ')
+
+
+@pytest.fixture
+def popular_author(user, settings):
+    '''Автор, чьи рецепты не раскладываются по лентам, а читаются по
+    подпискам: у него больше FEED_FANOUT_MAX_FOLLOWERS подписчиков'''
+    settings.FEED_FANOUT_MAX_FOLLOWERS = 1
+    popular = User.objects.create_user(
+        username='popular', email='popular@example.com', password='pass'
+    )
+    other = User.objects.create_user(
+        username='other', email='other@example.com', password='pass'
+    )
+    Follow.objects.create(user=other, author=popular)
+    Follow.objects.create(user=user, author=popular)
+    return popular
+
+
+def create_recipe(author, name):
+    return Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание рецепта',
+        image='recipes/test.png',
+        cooking_time=10,
+    )
+
+
+def get_all_pages(client, params):
+    ids = []
+    url = URL
+    while url:
+        response = client.get(url, params)
+        params = None
+        assert response.status_code == 200
+        data = response.json()
+        ids += [recipe['id'] for recipe in data['results']]
+        url = data['next']
+    return ids
+
+
+def test_feed_cursor_pages(user_client, feed_recipes):
+    assert get_all_pages(user_client, {'page_size': 1}) == [
+        recipe.pk for recipe in reversed(feed_recipes)
+    ]
+
+
+def test_feed_cursor_pages_with_equal_dates(user_client, feed_recipes):
+    pub_date = timezone.now()
+    Recipe.objects.update(pub_date=pub_date)
+    FeedEntry.objects.update(pub_date=pub_date)
+    assert get_all_pages(user_client, {'page_size': 2}) == [
+        recipe.pk for recipe in reversed(feed_recipes)
+    ]
+
+
+def test_feed_previous_link(user_client, feed_recipes):
+    first = user_client.get(URL, {'page_size': 2}).json()
+    assert first['previous'] is None
+    second = user_client.get(first['next']).json()
+    assert [recipe['id'] for recipe in second['results']] == [
+        feed_recipes[0].pk
+    ]
+    back = user_client.get(second['previous']).json()
+    assert back['results'] == first['results']
+    assert back['previous'] is None
+
+
+def test_feed_merges_popular_authors(
+    user, user_client, author, popular_author
+):
+    Follow.objects.create(user=user, author=author)
+    recipes = [
+        create_recipe(popular_author if index % 2 else author, str(index))
+        for index in range(5)
+    ]
+    assert not FeedEntry.objects.filter(
+        recipe__author=popular_author
+    ).exists()
+    assert get_all_pages(user_client, {'page_size': 2}) == [
+        recipe.pk for recipe in reversed(recipes)
+    ]
+
+
+def test_feed_page_query_count(
+    user_client, feed_recipes, django_assert_num_queries
+):
+    # Ключи ленты, рецепты популярных авторов, страница, теги, ингредиенты.
+    with django_assert_num_queries(5):
+        user_client.get(URL, {'page_size': 2})
+
+
+def test_unfollow_backfill_runs_after_commit(
+    user, popular_author, django_capture_on_commit_callbacks
+):
+    recipe = create_recipe(popular_author, 'Новый')
+    with django_capture_on_commit_callbacks() as callbacks:
+        Follow.objects.get(
+            user__username='other', author=popular_author
+        ).delete()
+    assert not FeedEntry.objects.filter(recipe=recipe).exists()
+    for callback in callbacks:
+        callback()
+    assert FeedEntry.objects.get(
+        user=user, recipe=recipe
+    ).pub_date == recipe.pub_date
+
+
+@pytest.mark.parametrize('params', [{'page_size': 1}, {'limit': 1}, {}])
+def test_feed_search_pages(user_client, feed_recipes, params):
+    ids = get_all_pages(user_client, {**params, 'search': 'борщ'})
+    assert sorted(ids) == [recipe.pk for recipe in feed_recipes]
@@ -0,0 +1,40 @@
+import pytest
+from django.db import connection
+from recipes.models import (Favorite, Ingredient, RecipeIngredients,
+                            ShoppingCart)
+from users.models import Follow
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='EXPLAIN проверяется только на PostgreSQL'
+    ),
+]
+
+LOOKUPS = [
+    (Ingredient, {'name': 'соль', 'measurement_unit': 'г'},
+     'unique_ingredient'),
+    (RecipeIngredients, {'recipe_id': 1, 'ingredient_id': 1},
+     'unique_recipe_ingredient'),
+    (Favorite, {'user_id': 1, 'recipe_id': 1}, 'unique_favorite'),
+    (ShoppingCart, {'user_id': 1, 'recipe_id': 1}, 'unique_shopping_cart'),
+    (Follow, {'user_id': 1, 'author_id': 1}, 'author_and_user_unique'),
+    (Ingredient, {'name__istartswith': 'сол'},
+     'recipes_ingredient_name_like'),
+]
+
+
+@pytest.fixture(autouse=True)
+def disable_seqscan(db):
+    '''На пустых таблицах планировщик иначе выбирает Seq Scan'''
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+@pytest.mark.parametrize(
+    'model, lookup, index', LOOKUPS, ids=[index for *_, index in LOOKUPS]
+)
+def test_lookup_uses_index(model, lookup, index):
+    plan = model.objects.filter(**lookup).explain()
+    assert index in plan, plan
@@ -0,0 +1,47 @@
+import pytest
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/ingredients/'
+
+
+@pytest.fixture
+def salt_ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in ('Фасоль', 'соль', 'Морская соль', 'Солод', 'Сахар')
+    ]
+
+
+def search(client, name):
+    response = client.get(URL, {'name': name})
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()]
+
+
+def test_prefix_matches_first(client, salt_ingredients):
+    assert search(client, 'сол') == [
+        'Солод', 'соль', 'Морская соль', 'Фасоль'
+    ]
+
+
+def test_search_limit(client, settings, salt_ingredients):
+    settings.INGREDIENT_SEARCH_LIMIT = 3
+    assert search(client, 'сол') == ['Солод', 'соль', 'Морская соль']
+    settings.INGREDIENT_SEARCH_LIMIT = 1
+    assert search(client, 'с') == ['Сахар']
+
+
+def test_index_rebuilt_after_ingredient_change(client, salt_ingredients):
+    assert search(client, 'сол') == [
+        'Солод', 'соль', 'Морская соль', 'Фасоль'
+    ]
+    Ingredient.objects.create(name='Солянка', measurement_unit='г')
+    salt, malt = salt_ingredients[1], salt_ingredients[3]
+    salt.name = 'Поваренная соль'
+    salt.save()
+    malt.delete()
+    assert search(client, 'сол') == [
+        'Солянка', 'Морская соль', 'Поваренная соль', 'Фасоль'
+    ]
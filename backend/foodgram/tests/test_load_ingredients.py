@@ -0,0 +1,25 @@
+import io
+
+import pytest
+from django.core.management.base import CommandError
+from recipes.management.commands import load_ingredients
+
+DATA = (
+    ' [ {"name": "соль, йодированная", "measurement_unit": "г"} ,\n'
+    '{"name": "яйца", "measurement_unit": "шт"}\n ] '
+)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_read_json_across_chunks(monkeypatch, chunk_size):
+    monkeypatch.setattr(load_ingredients, 'CHUNK_SIZE', chunk_size)
+    assert list(load_ingredients.read_json(io.StringIO(DATA))) == [
+        ('соль, йодированная', 'г'),
+        ('яйца', 'шт'),
+    ]
+
+
+def test_read_json_truncated_file(monkeypatch):
+    monkeypatch.setattr(load_ingredients, 'CHUNK_SIZE', 7)
+    with pytest.raises(CommandError):
+        list(load_ingredients.read_json(io.StringIO(DATA[:-4])))
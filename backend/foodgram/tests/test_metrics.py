@@ -0,0 +1,29 @@
+import os
+import re
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+SAMPLE = re.compile(r'^(\w+)\{(.*)\} \S+$')
+
+
+def test_every_series_has_pid_label(client):
+    client.get('/api/tags/')
+    response = client.get('/api/metrics/')
+    assert response.status_code == 200
+    samples = [
+        line for line in response.content.decode().splitlines()
+        if not line.startswith('#')
+    ]
+    assert any(
+        line.startswith('foodgram_http_requests_total') for line in samples
+    )
+    for line in samples:
+        labels = SAMPLE.match(line).group(2)
+        assert labels.startswith(f'pid="{os.getpid()}",'), line
+
+
+def test_server_timing_counts_queries(client, tags):
+    response = client.get('/api/tags/')
+    assert '"1 queries, 0 duplicates"' in response['Server-Timing']
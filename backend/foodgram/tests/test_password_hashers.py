@@ -0,0 +1,30 @@
+import pytest
+from django.contrib.auth.hashers import (PBKDF2PasswordHasher,
+                                         PBKDF2SHA1PasswordHasher, get_hasher,
+                                         identify_hasher)
+from rest_framework.test import APIClient
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+PASSWORD = 'cook-password'
+
+
+@pytest.mark.parametrize('legacy_hasher', (
+    PBKDF2SHA1PasswordHasher, PBKDF2PasswordHasher
+))
+def test_legacy_hash_is_upgraded_on_login(user, legacy_hasher):
+    hasher = legacy_hasher()
+    User.objects.filter(pk=user.pk).update(
+        password=hasher.encode(PASSWORD, hasher.salt(), iterations=1000)
+    )
+    response = APIClient().post(
+        '/api/auth/token/login/',
+        {'email': user.email, 'password': PASSWORD},
+    )
+    assert response.status_code == 200
+    user.refresh_from_db()
+    configured = get_hasher()
+    assert identify_hasher(user.password).algorithm == configured.algorithm
+    assert not configured.must_update(user.password)
+    assert user.check_password(PASSWORD)
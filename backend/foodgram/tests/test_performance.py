@@ -0,0 +1,40 @@
+import io
+import random
+
+import pytest
+from api.management.commands.benchmark_api import (BUDGETS, Command,
+                                                   get_violations, measure_url)
+from rest_framework.test import APIClient
+
+pytestmark = [pytest.mark.django_db, pytest.mark.performance]
+
+DATASET = {
+    'users': 200,
+    'recipes': 500,
+    'ingredients_per_recipe': 8,
+    'favorites': 1000,
+    'follows': 500,
+    'cart': 50,
+}
+
+
+@pytest.fixture
+def dataset():
+    random.seed(0)
+    return Command(stdout=io.StringIO()).seed(DATASET)
+
+
+@pytest.mark.parametrize('name', BUDGETS)
+def test_endpoint_within_budget(dataset, name):
+    '''Время ответа в CI зависит от машины, поэтому здесь проверяются
+    только число запросов и размер ответа, а задержки - в benchmark_api'''
+    user, prefix = dataset
+    client = APIClient()
+    client.force_authenticate(user)
+    result = measure_url(
+        client,
+        BUDGETS[name]['url'].format(prefix=prefix),
+        repeat=2,
+        cache_namespace=BUDGETS[name].get('cache'),
+    )
+    assert get_violations(name, result, ('queries', 'bytes')) == []
@@ -0,0 +1,48 @@
+import pytest
+from api.v1 import renderers
+from api.v1.mixins import ValuesListMixin
+from recipes.models import Favorite, Recipe, ShoppingCart
+from rest_framework.mixins import ListModelMixin
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(user, author, make_recipes):
+    recipes = make_recipes(3)
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    Follow.objects.create(user=user, author=author)
+    Recipe.objects.filter(pk=recipes[2].pk).update(renditions={
+        'source': 'recipes/test.png',
+        'small': {
+            'jpg': 'recipes/renditions/ab/abc_small.jpg',
+            'webp': 'recipes/renditions/ab/abc_small.webp',
+        },
+    })
+    return recipes
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/?limit=10',
+    '/api/recipes/?page_size=10',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/ingredients/?measurement_unit=г',
+))
+def test_values_serializers_match_drf(user_client, recipes, monkeypatch,
+                                      url):
+    '''Ответ из values() через orjson совпадает с ответом сериализаторов
+    DRF через стандартный JSONRenderer байт в байт'''
+    fast = user_client.get(url)
+    assert fast.status_code == 200
+    monkeypatch.setattr(ValuesListMixin, 'list', ListModelMixin.list)
+    monkeypatch.setattr(renderers, 'orjson', None)
+    monkeypatch.setattr(
+        'api.v1.cache.get_cache_version', lambda namespace: 'drf'
+    )
+    slow = user_client.get(url)
+    assert slow.status_code == 200
+    assert fast.json() == slow.json()
+    assert fast.content == slow.content
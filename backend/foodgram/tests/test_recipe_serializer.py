@@ -0,0 +1,94 @@
+import pytest
+from api.v1.serializers import RecipeSerializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import RecipeIngredients
+from rest_framework.exceptions import ValidationError
+
+pytestmark = pytest.mark.django_db
+
+
+def get_rows(recipe):
+    return {
+        row.ingredient_id: row
+        for row in RecipeIngredients.objects.filter(recipe=recipe)
+    }
+
+
+def test_update_ingredients_changes_only_changed_rows(make_recipes,
+                                                      ingredients):
+    recipe, = make_recipes(1)
+    before = get_rows(recipe)
+    kept, changed, removed = ingredients[:3]
+    with CaptureQueriesContext(connection) as context:
+        RecipeSerializer.update_ingredients(recipe, [
+            {'ingredient': kept, 'amount': 1},
+            {'ingredient': changed, 'amount': 5},
+            {'ingredient': ingredients[3], 'amount': 2},
+        ])
+    after = get_rows(recipe)
+    assert set(after) == {kept.pk, changed.pk, ingredients[3].pk}
+    assert after[kept.pk].pk == before[kept.pk].pk
+    assert after[changed.pk].pk == before[changed.pk].pk
+    assert after[changed.pk].amount == 5
+    assert after[ingredients[3].pk].amount == 2
+    assert not RecipeIngredients.objects.filter(
+        pk=before[removed.pk].pk
+    ).exists()
+    updates = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('UPDATE')
+    ]
+    assert len(updates) == 1
+    assert f'IN ({before[changed.pk].pk})' in updates[0]
+    # Строки рецепта, удаление, вставка, обновление и корзины рецепта.
+    assert len(context) == 5
+
+
+def test_update_ingredients_without_changes(make_recipes, ingredients,
+                                            django_assert_num_queries):
+    recipe, = make_recipes(1)
+    with django_assert_num_queries(1):
+        RecipeSerializer.update_ingredients(recipe, [
+            {'ingredient': ingredient, 'amount': 1}
+            for ingredient in ingredients[:3]
+        ])
+
+
+def test_validate_resolves_ids_with_one_query_per_model(
+    ingredients, tags, django_assert_num_queries
+):
+    with django_assert_num_queries(2):
+        data = RecipeSerializer().validate({
+            'ingredients': [
+                {'ingredient_id': ingredient.pk, 'amount': 3}
+                for ingredient in ingredients[:5]
+            ],
+            'tags': [tag.pk for tag in tags],
+        })
+    assert [item['ingredient'] for item in data['ingredients']] == (
+        ingredients[:5]
+    )
+    assert data['tags'] == tags
+
+
+def test_validate_reports_all_missing_and_duplicate_ids(ingredients, tags):
+    missing = ingredients[-1].pk + 1
+    with pytest.raises(ValidationError) as error:
+        RecipeSerializer().validate({
+            'ingredients': [
+                {'ingredient_id': pk, 'amount': 1}
+                for pk in (
+                    ingredients[0].pk, missing, ingredients[1].pk,
+                    ingredients[0].pk, missing + 1,
+                )
+            ],
+            'tags': [tags[0].pk, tags[1].pk, tags[1].pk],
+        })
+    assert error.value.detail == {
+        'ingredients': [
+            f'Ингредиенты повторяются: {ingredients[0].pk}',
+            f'Ингредиенты не найдены: {missing}, {missing + 1}',
+        ],
+        'tags': [f'Теги повторяются: {tags[1].pk}'],
+    }
@@ -0,0 +1,58 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('limit', (2, 10))
+def test_recipe_list_query_count_does_not_depend_on_page_size(
+    user_client, make_recipes, django_assert_num_queries, limit
+):
+    make_recipes(12)
+    # COUNT, страница рецептов, теги и ингредиенты страницы.
+    with django_assert_num_queries(4):
+        response = user_client.get(f'/api/recipes/?limit={limit}')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+
+
+def test_search_pages_follow_rank(user_client, author):
+    names_and_texts = [
+        ('Борщ', 'Борщ'),
+        ('Зеленый борщ', 'Суп'),
+        ('Суп', 'Почти борщ'),
+    ]
+    recipes = {}
+    for copy in range(2):
+        for name, text in names_and_texts:
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'{name} {copy}',
+                text=text,
+                image='recipes/test.png',
+                cooking_time=10,
+            )
+            recipes[recipe.pk] = recipe.name
+    with CaptureQueriesContext(connection) as context:
+        pages = [
+            user_client.get(
+                '/api/recipes/', {'search': 'борщ', 'limit': 2, 'offset': 2}
+            ).json(),
+            user_client.get(
+                '/api/recipes/', {'search': 'борщ', 'limit': 2, 'offset': 4}
+            ).json(),
+        ]
+    assert pages[0]['count'] == 6
+    assert [item['name'] for item in pages[0]['results']] == [
+        'Зеленый борщ 1', 'Зеленый борщ 0'
+    ]
+    assert [item['name'] for item in pages[1]['results']] == [
+        'Суп 1', 'Суп 0'
+    ]
+    if connection.vendor != 'postgresql':
+        # Одна ветка CASE на значение ранга, а не на каждый рецепт
+        assert max(
+            query['sql'].count('WHEN') for query in context.captured_queries
+        ) <= 3
@@ -0,0 +1,45 @@
+import pytest
+from recipes.models import RecipeSimilarity
+from recipes.recommendations import (compute_similarities_python,
+                                     compute_similarities_sparse,
+                                     get_recipe_features, sparse)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('sparse_path', [False, True])
+def test_recipes_created_after_snapshot_are_skipped(make_recipes,
+                                                    sparse_path):
+    if sparse_path and sparse is None:
+        pytest.skip('Нужны NumPy и SciPy')
+    make_recipes(3)
+    recipe_ids, favorites, ingredients = get_recipe_features()
+    make_recipes(1)
+    features = (favorites, ingredients)
+    if sparse_path:
+        pairs = compute_similarities_sparse(
+            recipe_ids, features, (0.5, 0.5), 5, chunk_size=2
+        )
+    else:
+        pairs = compute_similarities_python(
+            recipe_ids, features, (0.5, 0.5), 5
+        )
+    pairs = list(pairs)
+    assert pairs
+    assert {
+        recipe for pair in pairs for recipe in pair[:2]
+    } <= set(recipe_ids)
+
+
+@pytest.mark.django_db
+def test_similar_unknown_recipe(user_client):
+    response = user_client.get('/api/recipes/0/similar/')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_similar(user_client, make_recipes):
+    recipe, other = make_recipes(2)
+    RecipeSimilarity.objects.create(recipe=recipe, similar=other, score=1)
+    response = user_client.get(f'/api/recipes/{recipe.pk}/similar/')
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json()] == [other.pk]
@@ -0,0 +1,19 @@
+import pytest
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def test_short_recipe_keeps_original_image(user_client, make_recipes):
+    recipe, = make_recipes(1)
+    Recipe.objects.filter(pk=recipe.pk).update(renditions={
+        'source': 'recipes/test.png',
+        'small': {'jpeg': 'recipes/renditions/ab/abc_small.jpeg'},
+    })
+    response = user_client.post(f'/api/recipes/{recipe.pk}/favorite/')
+    assert response.status_code == 201
+    data = response.json()
+    assert data['image'] == '/media/recipes/test.png'
+    assert data['image_renditions'] == {
+        'small': {'jpeg': '/media/recipes/renditions/ab/abc_small.jpeg'},
+    }
@@ -0,0 +1,77 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe, ShoppingCartIngredient
+from recipes.signals import bulk_change, in_bulk_change
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/download_shopping_cart/'
+BATCH_URL = '/api/recipes/shopping_cart/'
+
+
+def test_unknown_format_error_is_readable_text(user_client):
+    response = user_client.get(f'{URL}?format=pdf')
+    assert response.status_code == 404
+    assert response.content.decode() == 'Not found.'
+
+
+def test_auth_error_is_readable_text(client):
+    response = client.get(f'{URL}?format=txt')
+    assert response.status_code == 401
+    assert response.content.decode() == (
+        'Authentication credentials were not provided.'
+    )
+
+
+def cart_contents(user):
+    return sorted(
+        ShoppingCartIngredient.objects.filter(
+            user=user
+        ).values_list('user', 'ingredient', 'amount')
+    )
+
+
+def test_batch_changes_keep_cart_ingredients(user, user_client, make_recipes):
+    ids = [recipe.pk for recipe in make_recipes(5)]
+    response = user_client.post(
+        BATCH_URL, {'recipes': ids[:4]}, format='json'
+    )
+    assert response.status_code == 201
+    response = user_client.delete(
+        BATCH_URL, {'recipes': ids[1:3] + ids[4:]}, format='json'
+    )
+    assert response.status_code == 204
+    assert cart_contents(user) == sorted(
+        ShoppingCartIngredient.calculate([user.pk])
+    )
+    assert list(
+        Recipe.objects.filter(pk__in=ids).order_by('pk').values_list(
+            'carts_count', flat=True
+        )
+    ) == [1, 0, 0, 1, 0]
+    response = user_client.post(f'{BATCH_URL}clear/')
+    assert response.status_code == 204
+    assert cart_contents(user) == []
+
+
+@pytest.mark.skipif(
+    not connection.features.has_select_for_update,
+    reason='База не поддерживает SELECT ... FOR UPDATE'
+)
+def test_batch_add_locks_user(user_client, make_recipes):
+    ids = [recipe.pk for recipe in make_recipes(2)]
+    with CaptureQueriesContext(connection) as context:
+        user_client.post(BATCH_URL, {'recipes': ids}, format='json')
+    assert any(
+        'users_user' in query['sql'] and 'FOR UPDATE' in query['sql']
+        for query in context.captured_queries
+    )
+
+
+def test_bulk_change_is_reentrant():
+    with bulk_change():
+        with bulk_change():
+            assert in_bulk_change()
+        assert in_bulk_change()
+    assert not in_bulk_change()
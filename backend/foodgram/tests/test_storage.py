@@ -0,0 +1,54 @@
+import io
+import os
+import time
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from recipes.models import Recipe
+from recipes.storage import content_storage
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def make_old(name, minutes=120):
+    path = content_storage.path(name)
+    timestamp = time.time() - minutes * 60
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_same_content_is_saved_once(media_root):
+    first = content_storage.save('recipes/a.png', ContentFile(b'photo'))
+    second = content_storage.save('recipes/b.PNG', ContentFile(b'photo'))
+    assert first == second
+    assert first.endswith('.png')
+    assert os.listdir(os.path.dirname(content_storage.path(first))) == [
+        os.path.basename(first)
+    ]
+
+
+@pytest.mark.django_db
+def test_resave_protects_old_file_from_garbage_collection(media_root):
+    name = content_storage.save('recipes/a.png', ContentFile(b'photo'))
+    make_old(name)
+    content_storage.save('recipes/a.png', ContentFile(b'photo'))
+    call_command('collect_media_garbage', stdout=io.StringIO())
+    assert content_storage.exists(name)
+    make_old(name)
+    call_command('collect_media_garbage', stdout=io.StringIO())
+    assert not content_storage.exists(name)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deleting_recipe_keeps_image(media_root, author):
+    name = content_storage.save('recipes/a.png', ContentFile(b'photo'))
+    recipe = Recipe.objects.create(
+        author=author, name='Рецепт', text='Описание', image=name,
+        cooking_time=10,
+    )
+    recipe.delete()
+    assert content_storage.exists(name)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (Argon2PasswordHasher,
+                                         BCryptSHA256PasswordHasher,
+                                         PBKDF2PasswordHasher)
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    '''PBKDF2 с числом итераций из PASSWORD_HASH_ITERATIONS.
+
+    Алгоритм совпадает со стандартным, поэтому существующие хэши
+    проверяются как прежде и пересчитываются при входе, если число
+    итераций в них отличается от настроенного.
+    '''
+    iterations = settings.PASSWORD_HASH_ITERATIONS
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+class TunableBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    rounds = settings.BCRYPT_ROUNDS
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 03:34
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_follow_unique'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'ordering': ('-id',)},
+        ),
+    ]
@@ -1,6 +1,37 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+class UserQuerySet(models.QuerySet):
+    def with_is_subscribed(self, user):
+        '''Аннотирует пользователей флагом подписки на них'''
+        if user.is_anonymous:
+            return self.annotate(
+                is_subscribed=Value(False, models.BooleanField())
+            )
+        return self.annotate(
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user,
+                author=OuterRef('pk')
+            ))
+        )
+
+    def recalculate_followers_count(self):
+        '''Пересчитывает счетчики подписчиков по таблице подписок'''
+        return self.update(followers_count=Coalesce(Subquery(
+            Follow.objects.filter(
+                author=OuterRef('pk')
+            ).order_by().values('author').annotate(
+                total=Count('id')
+            ).values('total')
+        ), 0))
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -33,6 +64,19 @@ class User(AbstractUser):
         blank=False,
         verbose_name='Фамилия',
     )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков',
+    )
+
+    objects = CustomUserManager()
+
+    @classmethod
+    def change_followers_count(cls, user_id, difference):
+        cls.objects.filter(pk=user_id).update(
+            followers_count=Greatest(F('followers_count') + difference, 0)
+        )
 
 
 class Follow(models.Model):
@@ -52,10 +96,13 @@ class Follow(models.Model):
     )
 
     class Meta:
-        models.UniqueConstraint(
-            fields=['user', 'author'],
-            name='author_and_user_unique'
-        )
+        ordering = ('-id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='author_and_user_unique'
+            )
+        ]
 
     def __str__(self):
         return (